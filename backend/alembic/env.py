@@ -27,6 +27,10 @@ from app.models import transcripts, audio_files
 from app.models import transcription_chunks
 from app.models import verbs
 from app.models import prompts
+from app.models import audio_uploads
+from app.models import tasks
+from app.models import transcription_cache
+from app.models import llm_calls
 
 target_metadata = Base.metadata
 
@@ -20,7 +20,7 @@ celery.conf.update(
 )
 
 # Import esplicito dei task per forzarne la registrazione
-from app.tasks import transcription_tasks
+from app.tasks import transcription_tasks, summary_tasks
 
 
 @celery.task
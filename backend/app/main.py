@@ -4,7 +4,10 @@ from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import ping, audio, transcriptions, summaries, users, prompts, clients
 from app.routers.websocket_manager import router as websocket_router, websocket_manager
-from app.routers import onedrive_management
+from app.routers import onedrive_management, audio_uploads, jobs
+from app.services.audio_process_pool import audio_process_pool
+from app.services.prompt_cache import prompt_cache
+from app.services.ai_gateway import ai_gateway
 
 load_dotenv()
 
@@ -28,8 +31,10 @@ print(f"✅ CORS attivi per: {allowed_origins}")
 
 # Router esistenti
 app.include_router(ping.router)
+app.include_router(audio_uploads.router)
 app.include_router(audio.router)
 app.include_router(transcriptions.router)
+app.include_router(jobs.router)
 app.include_router(summaries.router)
 app.include_router(users.router)
 app.include_router(websocket_router)
@@ -39,6 +44,17 @@ app.include_router(onedrive_management.router)
 # NUOVO: Router gestione clienti
 app.include_router(clients.router)
 
+@app.on_event("startup")
+def load_prompt_cache():
+    try:
+        prompt_cache.load_all()
+    except Exception as e:
+        print(f"⚠️ Cache dei prompt non caricata all'avvio, verrà riempita al primo utilizzo: {e}")
+
+@app.on_event("shutdown")
+def shutdown_audio_pool():
+    audio_process_pool.shutdown()
+
 # Health check endpoint aggiornato
 @app.get("/")
 async def root():
@@ -73,5 +89,7 @@ async def health_check():
             "cloud_storage": "Microsoft OneDrive",
             "websockets": "FastAPI WebSocket",
             "client_management": "Active"
-        }
+        },
+        "audio_process_pool": audio_process_pool.stats(),
+        "ai_gateway": ai_gateway.stats()
     }
\ No newline at end of file
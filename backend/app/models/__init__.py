@@ -3,4 +3,8 @@ from app.models.transcripts import Transcript
 from app.models.transcription_chunks import TranscriptionChunk
 from app.models.verbs import Verbs
 from app.models.prompts import Prompt
-from app.models.clients import Client
\ No newline at end of file
+from app.models.clients import Client
+from app.models.audio_uploads import AudioUpload
+from app.models.tasks import Task
+from app.models.transcription_cache import TranscriptionCache
+from app.models.llm_calls import LLMCall
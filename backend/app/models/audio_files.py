@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, LargeBinary 
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary, BigInteger, Float
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
 from app.database import Base 
 
@@ -8,7 +8,17 @@ class AudioFile(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     file_name = Column(String(255), nullable=False)  
-    file_data = Column(LargeBinary, nullable=False)  
+    # Solo record non ancora migrati nel blob store (vedi app/scripts/migrate_audio_blobs.py).
+    # Deferred: non viene mai caricato insieme al resto della riga
+    file_data = deferred(Column(LargeBinary, nullable=True))
+    storage_key = Column(String(255), nullable=True)  # Chiave nel blob store (SHA-256 del contenuto)
+    file_size = Column(BigInteger, nullable=True)
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 del contenuto
+    canonical_key = Column(String(255), nullable=True)  # Versione Opus mono 16 kHz nel blob store
+    duration_seconds = Column(Float, nullable=True)
+    codec = Column(String(50), nullable=True)
+    sample_rate = Column(Integer, nullable=True)
+    channels = Column(Integer, nullable=True)
     uploaded_at = Column(DateTime, default=datetime.utcnow)  
 
-    transcripts = relationship("Transcript", back_populates="audio")
\ No newline at end of file
+    transcripts = relationship("Transcript", back_populates="audio")
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, DateTime, BigInteger, ForeignKey
+from datetime import datetime
+from app.database import Base
+
+class AudioUpload(Base):
+    __tablename__ = "audio_uploads"
+
+    id = Column(String(36), primary_key=True, index=True)  # UUID dell'upload
+    file_name = Column(String(255), nullable=False)
+    total_size = Column(BigInteger, nullable=True)  # Dimensione dichiarata dal client, se nota
+    offset = Column(BigInteger, default=0, nullable=False)  # Ultimo byte ricevuto correttamente
+    status = Column(String(20), default="in_progress", nullable=False)  # 'in_progress', 'finalizing', 'completed'
+    content_hash = Column(String(64), nullable=True)  # Hash del file ricevuto, salvato prima dello spostamento nello storage
+    audio_file_id = Column(Integer, ForeignKey("audio_files.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean
+from datetime import datetime
+from app.database import Base
+
+class LLMCall(Base):
+    __tablename__ = "llm_calls"
+
+    id = Column(Integer, primary_key=True, index=True)
+    provider = Column(String(50), nullable=False)
+    model = Column(String(100), nullable=False)
+    operation = Column(String(50), nullable=False, index=True)  # es. 'summary', 'summary_map', 'client_data'
+    strategy = Column(String(20), nullable=False)  # 'single', 'map_reduce' o 'truncated'
+    # Token stimati prima dell'invio e token conteggiati dal provider nella risposta
+    estimated_input_tokens = Column(Integer, nullable=False, default=0)
+    input_tokens = Column(Integer, nullable=True)
+    output_tokens = Column(Integer, nullable=True)
+    truncated = Column(Boolean, nullable=False, default=False)
+    duration_ms = Column(Integer, nullable=False, default=0)
+    success = Column(Boolean, nullable=False, default=True)
+    error_message = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
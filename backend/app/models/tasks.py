@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Text, Boolean
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -9,6 +9,7 @@ class TaskStatus(enum.Enum):
     processing = "processing"
     completed = "completed"
     failed = "failed"
+    cancelled = "cancelled"
 
 class Task(Base):
     __tablename__ = "tasks"
@@ -18,9 +19,15 @@ class Task(Base):
     status = Column(Enum(TaskStatus), default=TaskStatus.pending, nullable=False)
     result = Column(Text, nullable=True)  # Es. URL del .docx o ID del risultato
     error_message = Column(Text, nullable=True)
+    celery_task_id = Column(String(155), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    # opzionale se vuoi collegarlo a una trascrizione
-    #transcript_id = Column(Integer, ForeignKey("transcripts.id"), nullable=True)
-    #transcript = relationship("Transcript", back_populates="tasks")
+    # Avanzamento (0-100) con descrizione della fase corrente e richiesta di annullamento
+    progress = Column(Integer, default=0, nullable=False)
+    progress_message = Column(String(255), nullable=True)
+    cancel_requested = Column(Boolean, default=False, nullable=False)
+
+    # Oggetto del job e risultato prodotto
+    audio_file_id = Column(Integer, ForeignKey("audio_files.id"), nullable=True)
+    transcript_id = Column(Integer, ForeignKey("transcripts.id"), nullable=True)
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, UniqueConstraint
+from datetime import datetime
+from app.database import Base
+
+class TranscriptionCache(Base):
+    __tablename__ = "transcription_cache"
+    __table_args__ = (
+        UniqueConstraint("content_hash", "model", "language", "preprocessing_version", name="uq_transcription_cache_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    # Chiave: stesso contenuto audio, stesso modello, stessa lingua e stessa pre-elaborazione
+    content_hash = Column(String(64), nullable=False, index=True)
+    model = Column(String(50), nullable=False)
+    language = Column(String(10), nullable=False)
+    preprocessing_version = Column(String(50), nullable=False)
+    transcript_text = Column(Text, nullable=False)
+    segments = Column(JSON, nullable=True)
+    size_bytes = Column(Integer, nullable=False, default=0)  # Dimensione del risultato, per il limite totale della cache
+    hit_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    last_used_at = Column(DateTime, default=datetime.utcnow, index=True)
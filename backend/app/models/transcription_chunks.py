@@ -1,15 +1,22 @@
-from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey, Float, JSON, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.database import Base
 from datetime import datetime
 
 class TranscriptionChunk(Base):
     __tablename__ = "transcription_chunks"
+    __table_args__ = (
+        # Un solo checkpoint per pezzo, anche se due worker trascrivono la stessa trascrizione
+        UniqueConstraint("transcript_id", "chunk_number", name="uq_transcription_chunks_transcript_chunk"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     transcript_id = Column(Integer, ForeignKey("transcripts.id"), nullable=False)
     chunk_number = Column(Integer, nullable=False)  
     chunk_text = Column(Text, nullable=False)
+    start_offset = Column(Float, nullable=True)  # Inizio del pezzo nell'audio originale (secondi)
+    end_offset = Column(Float, nullable=True)
+    segments = Column(JSON, nullable=True)  # Segmenti Whisper con timestamp già riportati all'audio originale
     created_at = Column(DateTime, default=datetime.utcnow)
 
     transcript = relationship("Transcript", back_populates="chunks", foreign_keys=[transcript_id])
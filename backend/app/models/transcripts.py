@@ -1,5 +1,5 @@
-from sqlalchemy import JSON, Column, Integer, Text, DateTime, ForeignKey, LargeBinary
-from sqlalchemy.orm import relationship
+from sqlalchemy import JSON, Column, Integer, Text, DateTime, ForeignKey, LargeBinary, String
+from sqlalchemy.orm import relationship, deferred
 from .audio_files import AudioFile
 from datetime import datetime
 from app.database import Base
@@ -14,7 +14,14 @@ class Transcript(Base):
     word_doc = Column(LargeBinary, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     transcript_text = Column(Text, nullable=True)
-    segments = Column(JSON, nullable=True)
+    segments = Column(JSON, nullable=True)  # Array paralleli {"start": [...], "end": [...], "text": [...]}
+    segment_diagnostics = deferred(Column(JSON, nullable=True))  # avg_logprob, no_speech_prob, ... caricati solo se richiesti
+    status = Column(String(20), nullable=True)  # 'processing', 'completed', 'failed' (NULL per i record precedenti)
+    chunk_plan = Column(JSON, nullable=True)  # Pezzi pianificati [[inizio, fine], ...] per riprendere la trascrizione
+    # Modello, lingua e pre-elaborazione con cui è stata prodotta (chiave della cache, NULL per i record precedenti)
+    model = Column(String(50), nullable=True)
+    language = Column(String(10), nullable=True)
+    preprocessing_version = Column(String(50), nullable=True)
     audio = relationship("AudioFile", back_populates="transcripts")
     chunks = relationship("TranscriptionChunk", back_populates="transcript")  # Specifica la chiave esplicitamente
     verbs = relationship("Verbs", back_populates="transcript")
\ No newline at end of file
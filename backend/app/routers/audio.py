@@ -1,23 +1,41 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query, Request, BackgroundTasks
+from fastapi.responses import StreamingResponse, Response, FileResponse
 from sqlalchemy.orm import Session 
 from sqlalchemy.future import select
+from sqlalchemy import func
 from app.models.audio_files import AudioFile
+from app.models.transcripts import Transcript
 from app.database import get_db
 from app.models import *
 from app.routers.websocket_manager import websocket_manager
 from app.utils.onedrive_utils import onedrive_integration
+from app.services.audio_storage import save_upload_stream, read_audio_bytes, delete_stored_audio
+from app.services.audio_ingest import build_audio_record, run_post_ingest_stages, post_ingest_in_progress
+from app.services.waveform import read_peaks_level
+from app.services.audio_dedup import find_duplicate_audio, reusable_results
+from app.services.blob_store import blob_store
+from app.services.audio_clips import extract_clip, cached_clip, CLIP_FORMATS, MAX_CLIP_SECONDS
+from app.services.audio_process_pool import audio_process_pool, AudioPoolSaturated
+from app.utils.http_range import parse_range_header, RangeNotSatisfiable
+from app.utils.segments import segment_count, segment_bounds
+from starlette.concurrency import run_in_threadpool
 import uuid
 import asyncio
+import mimetypes
 
 router = APIRouter()
 
+# Blocchi inviati durante lo streaming audio
+STREAM_CHUNK_SIZE = 64 * 1024
+
 # API che permette il caricamento di un file audio e il salvataggio a DB - RIMOSSO PARAMETRO ONEDRIVE
 @router.post("/audio/upload")
 async def upload_audio(
+    background_tasks: BackgroundTasks,
     audio_file: UploadFile = File(...), 
     db: Session = Depends(get_db)
 ):
-    """Carica file audio nel database - SALVATAGGIO ONEDRIVE RIMOSSO"""
+    """Carica file audio su disco a blocchi (memoria costante) e registra i metadati nel database"""
     
     if not audio_file:
         print("Nessun file ricevuto")
@@ -26,21 +44,38 @@ async def upload_audio(
     print(f"Nome del file ricevuto: {audio_file.filename}")
     
     try:
-        file_content = audio_file.file.read()  
-        print(f"📦 Dimensione del file: {len(file_content)} byte")
+        stored = await save_upload_stream(audio_file)
+        print(f"📦 Dimensione del file: {stored['file_size']} byte")
 
-        # Crea un nuovo record nel database
-        new_audio = AudioFile(file_name=audio_file.filename, file_data=file_content)
+        # Stesso contenuto già caricato: si collega il record esistente invece di crearne uno nuovo
+        duplicate = find_duplicate_audio(db, stored["content_hash"])
+        if duplicate:
+            print(f"♻️ File già presente (audio {duplicate.id}), nessuna nuova copia")
+            await websocket_manager.send_notification("File già caricato in precedenza")
+            return {
+                "audio_file_id": duplicate.id,
+                "job_id": str(uuid.uuid4()),
+                "duplicate": True,
+                **reusable_results(db, stored["content_hash"]),
+                "message": "File già presente: verrà riutilizzato quello esistente"
+            }
+
+        # Crea un nuovo record nel database (solo riferimento e metadati, non il contenuto)
+        new_audio = await run_in_threadpool(build_audio_record, audio_file.filename, stored)
         db.add(new_audio)
         db.commit()
         db.refresh(new_audio)
 
+        # Elaborazioni una tantum (formato canonico, picchi forma d'onda) dopo la risposta
+        background_tasks.add_task(run_post_ingest_stages, new_audio.id)
+
         job_id = str(uuid.uuid4())  
         print(f"🆔 Job ID generato: {job_id}")
         
         response_data = {
             "audio_file_id": new_audio.id, 
             "job_id": job_id, 
+            "duplicate": False,
             "message": "File caricato con successo!"
         }
 
@@ -68,7 +103,7 @@ async def save_audio_onedrive(audio_id: int, db: Session = Depends(get_db)):
         await websocket_manager.send_notification("Salvataggio su OneDrive in corso...")
         
         onedrive_result = await onedrive_integration.save_audio_to_onedrive(
-            audio_data=audio_file.file_data,
+            audio_data=await run_in_threadpool(read_audio_bytes, audio_file),
             filename=audio_file.file_name
         )
         
@@ -98,22 +133,70 @@ async def save_audio_onedrive(audio_id: int, db: Session = Depends(get_db)):
 
 # API per ottenere la lista dei file audio caricati
 @router.get("/audio")
-def get_audio_files(db: Session = Depends(get_db)):
-    """Restituisce ID, nome file e data di caricamento"""
-    result = db.execute(select(AudioFile))
-    audio_files = result.scalars().all()
-
-    return [
-        {"id": file.id, "file_name": file.file_name, "uploaded_at": file.uploaded_at}
-        for file in audio_files
+def get_audio_files(
+    limit: int | None = Query(None, ge=1, le=200, description="Numero massimo di file restituiti (attiva la paginazione)"),
+    cursor: int | None = Query(None, description="next_cursor della pagina precedente"),
+    db: Session = Depends(get_db)
+):
+    """
+    Restituisce ID, nome file, data di caricamento e metadati.
+    Con limit o cursor la risposta è paginata per ID decrescente (keyset): {"items": [...], "next_cursor": ...};
+    senza parametri resta la lista completa, come per i client esistenti.
+    """
+    stmt = select(
+        AudioFile.id,
+        AudioFile.file_name,
+        AudioFile.uploaded_at,
+        AudioFile.file_size,
+        AudioFile.duration_seconds
+    )
+
+    paginated = limit is not None or cursor is not None
+    if paginated:
+        limit = limit or 50
+        stmt = stmt.order_by(AudioFile.id.desc()).limit(limit)
+        if cursor is not None:
+            stmt = stmt.where(AudioFile.id < cursor)
+    else:
+        stmt = stmt.order_by(AudioFile.id)
+
+    rows = db.execute(stmt).all()
+    items = [
+        {
+            "id": row.id,
+            "file_name": row.file_name,
+            "uploaded_at": row.uploaded_at,
+            "file_size": row.file_size,
+            "duration_seconds": row.duration_seconds
+        }
+        for row in rows
     ]
 
+    if not paginated:
+        return items
+
+    return {
+        "items": items,
+        "next_cursor": rows[-1].id if len(rows) == limit else None
+    }
+
 # Endpoint per ottenere dettagli file audio
 @router.get("/audio/{audio_id}")
 def get_audio_file_details(audio_id: int, db: Session = Depends(get_db)):
-    """Ottiene i dettagli di un file audio specifico"""
-    result = db.execute(select(AudioFile).filter(AudioFile.id == audio_id))
-    audio_file = result.scalar_one_or_none()
+    """Ottiene i dettagli di un file audio specifico senza leggere il contenuto binario"""
+    stmt = select(
+        AudioFile.id,
+        AudioFile.file_name,
+        AudioFile.uploaded_at,
+        # Per i record non ancora migrati la dimensione è calcolata dal database
+        func.coalesce(AudioFile.file_size, func.length(AudioFile.file_data)).label("file_size"),
+        AudioFile.content_hash,
+        AudioFile.duration_seconds,
+        AudioFile.codec,
+        AudioFile.sample_rate,
+        AudioFile.channels
+    ).filter(AudioFile.id == audio_id)
+    audio_file = db.execute(stmt).first()
     
     if not audio_file:
         raise HTTPException(status_code=404, detail="File audio non trovato")
@@ -121,10 +204,213 @@ def get_audio_file_details(audio_id: int, db: Session = Depends(get_db)):
     return {
         "id": audio_file.id,
         "file_name": audio_file.file_name,
-        "file_size": len(audio_file.file_data),
-        "uploaded_at": audio_file.uploaded_at
+        "file_size": audio_file.file_size,
+        "uploaded_at": audio_file.uploaded_at,
+        "content_hash": audio_file.content_hash,
+        "duration_seconds": audio_file.duration_seconds,
+        "codec": audio_file.codec,
+        "sample_rate": audio_file.sample_rate,
+        "channels": audio_file.channels
     }
 
+# Streaming del file audio con supporto Range (riproduzione con seek nell'editor)
+@router.get("/audio/{audio_id}/stream")
+def stream_audio_file(audio_id: int, request: Request, db: Session = Depends(get_db)):
+    """Restituisce il file audio (o l'intervallo richiesto con Range) leggendolo a blocchi dal blob store"""
+    stmt = select(
+        AudioFile.file_name,
+        AudioFile.storage_key,
+        AudioFile.content_hash
+    ).filter(AudioFile.id == audio_id)
+    audio_file = db.execute(stmt).first()
+
+    if not audio_file:
+        raise HTTPException(status_code=404, detail="File audio non trovato")
+
+    if not audio_file.storage_key:
+        raise HTTPException(status_code=409, detail="File audio non ancora migrato nel blob store")
+
+    file_size = blob_store.size(audio_file.storage_key)
+    etag = f'"{audio_file.content_hash}"'
+    media_type = mimetypes.guess_type(audio_file.file_name)[0] or "application/octet-stream"
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Cache-Control": "private, max-age=3600"
+    }
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    # If-Range: se il contenuto è cambiato si invia il file intero
+    if_range = request.headers.get("if-range")
+    if if_range and if_range != etag:
+        range_header = None
+
+    try:
+        byte_range = parse_range_header(range_header, file_size)
+    except RangeNotSatisfiable:
+        raise HTTPException(
+            status_code=416,
+            detail="Intervallo richiesto non valido",
+            headers={"Content-Range": f"bytes */{file_size}"}
+        )
+
+    if byte_range is None:
+        start, end, status_code = 0, file_size - 1, 200
+    else:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+
+    headers["Content-Length"] = str(end - start + 1 if file_size else 0)
+
+    return StreamingResponse(
+        blob_store.iter_range(audio_file.storage_key, start, end, STREAM_CHUNK_SIZE),
+        status_code=status_code,
+        media_type=media_type,
+        headers=headers
+    )
+
+def _clip_source(
+    db: Session,
+    audio_id: int,
+    start: float | None,
+    end: float | None,
+    transcript_id: int | None,
+    segment: int | None
+):
+    """
+    Valida la richiesta di clip e restituisce (chiave del blob da decodificare, content_hash, start, end).
+    La clip viene letta dalla versione canonica, più leggera da decodificare; l'originale solo se manca.
+    """
+    stmt = select(
+        AudioFile.storage_key,
+        AudioFile.canonical_key,
+        AudioFile.content_hash,
+        AudioFile.duration_seconds
+    ).filter(AudioFile.id == audio_id)
+    audio_file = db.execute(stmt).first()
+
+    if not audio_file:
+        raise HTTPException(status_code=404, detail="File audio non trovato")
+
+    if not audio_file.storage_key:
+        raise HTTPException(status_code=409, detail="File audio non ancora migrato nel blob store")
+
+    if transcript_id is not None and segment is not None:
+        transcript = db.execute(
+            select(Transcript.audio_id, Transcript.segments).filter(Transcript.id == transcript_id)
+        ).first()
+        if not transcript or transcript.audio_id != audio_id:
+            raise HTTPException(status_code=404, detail="Trascrizione non trovata per questo file audio")
+        if segment >= segment_count(transcript.segments):
+            raise HTTPException(status_code=404, detail="Segmento non trovato")
+        start, end = segment_bounds(transcript.segments, segment)
+
+    if start is None or end is None:
+        raise HTTPException(status_code=400, detail="Specificare start/end oppure transcript_id/segment")
+
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end deve essere maggiore di start")
+
+    if end - start > MAX_CLIP_SECONDS:
+        raise HTTPException(status_code=400, detail=f"La clip non può superare {MAX_CLIP_SECONDS:g} secondi")
+
+    if audio_file.duration_seconds is not None:
+        end = min(end, audio_file.duration_seconds)
+        if start >= end:
+            raise HTTPException(status_code=416, detail="Intervallo oltre la durata del file")
+
+    return audio_file.canonical_key or audio_file.storage_key, audio_file.content_hash, start, end
+
+# Estrazione di una clip (es. un segmento Whisper da riascoltare)
+@router.get("/audio/{audio_id}/clip")
+async def get_audio_clip(
+    audio_id: int,
+    start: float | None = Query(None, ge=0, description="Inizio in secondi"),
+    end: float | None = Query(None, gt=0, description="Fine in secondi"),
+    transcript_id: int | None = Query(None, description="In alternativa a start/end: trascrizione del segmento"),
+    segment: int | None = Query(None, ge=0, description="Indice del segmento in Transcript.segments"),
+    format: str = Query("opus", description="'opus' oppure 'mp3'"),
+    db: Session = Depends(get_db)
+):
+    """Restituisce l'intervallo richiesto come clip audio compatta, dalla cache se già estratta"""
+    if format not in CLIP_FORMATS:
+        raise HTTPException(status_code=400, detail="Formato non valido. Usa 'opus' o 'mp3'.")
+
+    source_key, content_hash, start, end = await run_in_threadpool(
+        _clip_source, db, audio_id, start, end, transcript_id, segment
+    )
+
+    try:
+        # Clip già in cache servite direttamente; l'estrazione con ffmpeg gira nel pool di processi audio
+        # e viene attesa sull'event loop, senza occupare un thread del threadpool
+        clip_path = cached_clip(content_hash, start, end, format) or await audio_process_pool.run_async(
+            extract_clip, source_key, content_hash, start, end, format
+        )
+    except AudioPoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except Exception as e:
+        print(f"❌ Errore durante l'estrazione della clip: {e}")
+        raise HTTPException(status_code=500, detail=f"Errore durante l'estrazione della clip: {str(e)}")
+
+    return FileResponse(
+        path=clip_path,
+        media_type=CLIP_FORMATS[format]["media_type"],
+        headers={"Cache-Control": "private, max-age=86400"}
+    )
+
+# Picchi della forma d'onda precalcolati
+@router.get("/audio/{audio_id}/peaks")
+def get_audio_peaks(
+    audio_id: int,
+    background_tasks: BackgroundTasks,
+    resolution: int = Query(1000, ge=1, description="Numero minimo di picchi desiderati (es. larghezza in pixel)"),
+    format: str = Query("binary", description="'binary' (coppie int16 min/max) oppure 'json'"),
+    db: Session = Depends(get_db)
+):
+    """Restituisce il livello di picchi più adatto alla risoluzione richiesta"""
+    stmt = select(AudioFile.storage_key, AudioFile.content_hash).filter(AudioFile.id == audio_id)
+    audio_file = db.execute(stmt).first()
+
+    if not audio_file:
+        raise HTTPException(status_code=404, detail="File audio non trovato")
+
+    if not audio_file.storage_key:
+        raise HTTPException(status_code=409, detail="File audio non ancora migrato nel blob store")
+
+    level = read_peaks_level(audio_file.content_hash, resolution)
+    if level is None:
+        # Non ancora calcolati (es. file caricati prima di questa funzione): si calcolano una volta in background.
+        # Il polling del client sul 202 non avvia altri calcoli finché quello in corso non termina
+        if not post_ingest_in_progress(audio_file.content_hash):
+            background_tasks.add_task(run_post_ingest_stages, audio_id)
+        return Response(status_code=202, content='{"status": "processing"}', media_type="application/json")
+
+    if format == "json":
+        values = memoryview(level["data"]).cast("h").tolist()
+        return {
+            "sample_rate": level["sample_rate"],
+            "samples_per_peak": level["samples_per_peak"],
+            "count": level["count"],
+            "min": values[0::2],
+            "max": values[1::2]
+        }
+
+    return Response(
+        content=level["data"],
+        media_type="application/octet-stream",
+        headers={
+            "X-Peaks-Sample-Rate": str(level["sample_rate"]),
+            "X-Peaks-Samples-Per-Peak": str(level["samples_per_peak"]),
+            "X-Peaks-Count": str(level["count"]),
+            "ETag": f'"{audio_file.content_hash}-{level["samples_per_peak"]}"',
+            "Cache-Control": "private, max-age=86400"
+        }
+    )
+
 # Endpoint per eliminare file audio
 @router.delete("/audio/{audio_id}")
 async def delete_audio_file(audio_id: int, db: Session = Depends(get_db)):
@@ -136,8 +422,24 @@ async def delete_audio_file(audio_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="File audio non trovato")
     
     try:
+        storage_key = audio_file.storage_key
+        canonical_key = audio_file.canonical_key
         db.delete(audio_file)
         db.commit()
+
+        # I file nel blob store possono essere condivisi da più record con lo stesso contenuto
+        if storage_key:
+            still_used = db.execute(
+                select(AudioFile.id).filter(AudioFile.storage_key == storage_key).limit(1)
+            ).first()
+            if not still_used:
+                delete_stored_audio(storage_key)
+        if canonical_key:
+            still_used = db.execute(
+                select(AudioFile.id).filter(AudioFile.canonical_key == canonical_key).limit(1)
+            ).first()
+            if not still_used:
+                delete_stored_audio(canonical_key)
         
         await websocket_manager.send_notification("File audio eliminato")
         
@@ -0,0 +1,321 @@
+from fastapi import APIRouter, Depends, HTTPException, Header, Request, BackgroundTasks
+from sqlalchemy.orm import Session
+from sqlalchemy.future import select
+from sqlalchemy import update
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel
+from typing import Optional
+from app.database import get_db
+from app.models.audio_uploads import AudioUpload
+from app.routers.websocket_manager import websocket_manager
+from app.services.audio_storage import (
+    UPLOAD_CHUNK_SIZE,
+    upload_part_path,
+    stage_upload_chunk,
+    commit_upload_chunk,
+    discard_staged_chunk,
+    hash_local_file,
+    move_into_storage,
+    stored_blob_info,
+    blob_exists,
+    discard_upload
+)
+from app.services.audio_ingest import build_audio_record, run_post_ingest_stages
+from app.services.audio_dedup import find_duplicate_audio, reusable_results
+import os
+import uuid
+
+router = APIRouter(prefix="/audio/uploads", tags=["Audio uploads"])
+
+class UploadCreateRequest(BaseModel):
+    file_name: str
+    total_size: Optional[int] = None
+
+def _get_upload(db: Session, upload_id: str, lock: bool = False) -> AudioUpload:
+    stmt = select(AudioUpload).filter(AudioUpload.id == upload_id)
+    if lock:
+        stmt = stmt.with_for_update()
+    upload = db.execute(stmt).scalar_one_or_none()
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload non trovato")
+    return upload
+
+def _upload_status(upload: AudioUpload) -> dict:
+    return {
+        "upload_id": upload.id,
+        "file_name": upload.file_name,
+        "offset": upload.offset,
+        "total_size": upload.total_size,
+        "status": upload.status,
+        "audio_file_id": upload.audio_file_id
+    }
+
+def _completed_response(upload: AudioUpload) -> dict:
+    return {
+        "audio_file_id": upload.audio_file_id,
+        "job_id": upload.id,
+        "message": "File caricato con successo!"
+    }
+
+# Crea una nuova sessione di upload riprendibile
+@router.post("")
+def create_upload(request: UploadCreateRequest, db: Session = Depends(get_db)):
+    """Registra un upload riprendibile e restituisce l'ID da usare per l'invio dei blocchi"""
+    upload = AudioUpload(
+        id=str(uuid.uuid4()),
+        file_name=request.file_name,
+        total_size=request.total_size,
+        offset=0
+    )
+    db.add(upload)
+    db.commit()
+    db.refresh(upload)
+
+    response_data = _upload_status(upload)
+    response_data["chunk_size"] = UPLOAD_CHUNK_SIZE
+    return response_data
+
+# Stato dell'upload: il client riprende da "offset"
+@router.get("/{upload_id}")
+def get_upload(upload_id: str, db: Session = Depends(get_db)):
+    """Restituisce l'offset dell'ultimo byte ricevuto correttamente"""
+    return _upload_status(_get_upload(db, upload_id))
+
+def _append_staged_chunk(db: Session, upload_id: str, old_offset: int, staging_path: str, received: int) -> int:
+    """
+    Rivendica l'offset con un update condizionato, copia il blocco nel file parziale e conferma.
+    Eseguita per intero nel threadpool: una richiesta concorrente in attesa del lock sulla riga
+    blocca solo il proprio thread, mai l'event loop.
+    """
+    try:
+        # Vince una sola richiesta per offset; il lock sulla riga dura solo la copia locale del blocco
+        claimed = db.execute(
+            update(AudioUpload)
+            .where(
+                AudioUpload.id == upload_id,
+                AudioUpload.offset == old_offset,
+                AudioUpload.status == "in_progress"
+            )
+            # Il contenuto cambia: l'hash calcolato da un complete precedente non vale più
+            .values(offset=old_offset + received, content_hash=None)
+        ).rowcount
+        if not claimed:
+            db.rollback()
+            current = _get_upload(db, upload_id)
+            raise HTTPException(
+                status_code=409,
+                detail={"message": "Offset non valido", "offset": current.offset}
+            )
+
+        new_offset = commit_upload_chunk(upload_id, old_offset, staging_path)
+        db.commit()
+        return new_offset
+    except Exception:
+        db.rollback()
+        raise
+
+# Accoda un blocco di dati (body grezzo) a partire da Upload-Offset
+@router.patch("/{upload_id}")
+async def append_upload(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+    db: Session = Depends(get_db)
+):
+    """
+    Accoda il body della richiesta al file parziale.
+    Upload-Offset deve coincidere con l'offset salvato, altrimenti risponde 409
+    con l'offset corretto da cui riprendere.
+    """
+    upload = await run_in_threadpool(_get_upload, db, upload_id)
+
+    if upload.status != "in_progress":
+        raise HTTPException(status_code=409, detail="Upload già completato o in finalizzazione")
+
+    if upload_offset != upload.offset:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Offset non valido", "offset": upload.offset}
+        )
+
+    old_offset = upload.offset
+    total_size = upload.total_size
+    # Nessuna transazione aperta durante la ricezione del body: una connessione lenta o già
+    # interrotta non deve bloccare la richiesta di ripresa del client
+    await run_in_threadpool(db.commit)
+
+    # Anche se il client si disconnette, i byte già ricevuti vengono accodati
+    staging_path = await stage_upload_chunk(upload_id, request.stream())
+
+    try:
+        received = os.path.getsize(staging_path)
+        if total_size is not None and old_offset + received > total_size:
+            raise HTTPException(status_code=400, detail="Dati oltre la dimensione dichiarata")
+
+        new_offset = await run_in_threadpool(
+            _append_staged_chunk, db, upload_id, old_offset, staging_path, received
+        )
+    finally:
+        discard_staged_chunk(staging_path)
+
+    return {"upload_id": upload_id, "offset": new_offset}
+
+def _begin_finalize(db: Session, upload_id: str, info: Optional[dict]) -> Optional[str]:
+    """
+    Con il lock sulla riga (solo per la durata di questa funzione): salva l'hash calcolato e porta
+    l'upload in "finalizing", così nessun PATCH può più modificare il file.
+    Restituisce l'hash del contenuto, None se l'upload è già stato completato.
+    """
+    try:
+        upload = _get_upload(db, upload_id, lock=True)
+        if upload.status == "completed":
+            db.commit()
+            return None
+
+        if info is not None:
+            # Un PATCH concluso durante il calcolo dell'hash: il file non è più quello letto
+            if info["file_size"] != upload.offset:
+                raise HTTPException(
+                    status_code=409,
+                    detail={"message": "Upload modificato durante la finalizzazione", "offset": upload.offset}
+                )
+            upload.content_hash = info["content_hash"]
+        elif upload.content_hash is None:
+            raise HTTPException(status_code=409, detail="File dell'upload non trovato")
+
+        upload.status = "finalizing"
+        content_hash = upload.content_hash
+        db.commit()
+        return content_hash
+    except Exception:
+        db.rollback()
+        raise
+
+def _stored_upload_file(upload_id: str, content_hash: str) -> dict:
+    """Sposta il file parziale nel blob store; al retry (file già spostato) usa il blob esistente"""
+    part_path = upload_part_path(upload_id)
+    try:
+        if os.path.exists(part_path):
+            return move_into_storage(part_path, content_hash, os.path.getsize(part_path))
+    except FileNotFoundError:
+        # Spostato nel frattempo da una finalizzazione concorrente
+        pass
+
+    if not blob_exists(content_hash):
+        raise HTTPException(status_code=409, detail="File dell'upload non trovato")
+    return stored_blob_info(content_hash)
+
+def _finish_upload(db: Session, upload_id: str, audio_file_id: Optional[int], new_audio=None) -> tuple:
+    """
+    Con il lock sulla riga: collega l'upload all'AudioFile (esistente o new_audio) e lo completa.
+    Restituisce (audio_file_id, creato); se una finalizzazione concorrente ha già completato
+    l'upload, new_audio viene scartato.
+    """
+    try:
+        upload = _get_upload(db, upload_id, lock=True)
+        if upload.status == "completed":
+            audio_file_id = upload.audio_file_id
+            db.commit()
+            return audio_file_id, False
+
+        if new_audio is not None:
+            db.add(new_audio)
+            db.flush()
+            audio_file_id = new_audio.id
+
+        upload.status = "completed"
+        upload.audio_file_id = audio_file_id
+        db.commit()
+        return audio_file_id, new_audio is not None
+    except Exception:
+        db.rollback()
+        raise
+
+# Finalizza l'upload e crea il record AudioFile
+@router.post("/{upload_id}/complete")
+async def complete_upload(upload_id: str, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    """
+    Sposta il file ricevuto nello storage audio e crea il relativo AudioFile.
+    L'hash viene calcolato prima di qualsiasi lock e salvato sull'upload prima dello spostamento:
+    se la finalizzazione fallisce dopo, il retry riparte dal blob già presente nello storage.
+    Le query con lock sulla riga girano nel threadpool e durano solo il tempo di un aggiornamento.
+    """
+    upload = await run_in_threadpool(_get_upload, db, upload_id)
+
+    if upload.status == "completed":
+        return _completed_response(upload)
+
+    if upload.total_size is not None and upload.offset != upload.total_size:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Upload incompleto", "offset": upload.offset}
+        )
+
+    if upload.offset == 0:
+        raise HTTPException(status_code=400, detail="Nessun dato ricevuto")
+
+    file_name = upload.file_name
+    # Chiude la transazione di lettura prima del calcolo dell'hash
+    await run_in_threadpool(db.commit)
+
+    try:
+        part_path = upload_part_path(upload_id)
+        info = None
+        if os.path.exists(part_path):
+            info = await run_in_threadpool(hash_local_file, part_path)
+
+        content_hash = await run_in_threadpool(_begin_finalize, db, upload_id, info)
+        if content_hash is None:
+            return _completed_response(await run_in_threadpool(_get_upload, db, upload_id))
+
+        stored = await run_in_threadpool(_stored_upload_file, upload_id, content_hash)
+
+        # Stesso contenuto già caricato: l'upload viene collegato al record esistente
+        duplicate = await run_in_threadpool(find_duplicate_audio, db, content_hash)
+        if duplicate:
+            audio_file_id, _ = await run_in_threadpool(_finish_upload, db, upload_id, duplicate.id)
+
+            await websocket_manager.send_notification("File già caricato in precedenza")
+            return {
+                "audio_file_id": audio_file_id,
+                "job_id": upload_id,
+                "duplicate": True,
+                **await run_in_threadpool(reusable_results, db, content_hash),
+                "message": "File già presente: verrà riutilizzato quello esistente"
+            }
+
+        # Metadati letti con ffprobe senza alcun lock
+        new_audio = await run_in_threadpool(build_audio_record, file_name, stored)
+        audio_file_id, created = await run_in_threadpool(_finish_upload, db, upload_id, None, new_audio)
+
+        if created:
+            background_tasks.add_task(run_post_ingest_stages, audio_file_id)
+            await websocket_manager.send_notification("File salvato con successo")
+
+        return {
+            "audio_file_id": audio_file_id,
+            "job_id": upload_id,
+            "duplicate": False,
+            "message": "File caricato con successo!"
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        await run_in_threadpool(db.rollback)
+        print(f"Errore durante la finalizzazione dell'upload: {e}")
+        raise HTTPException(status_code=500, detail=f"Errore durante l'upload: {str(e)}")
+
+# Annulla un upload in corso
+@router.delete("/{upload_id}")
+def cancel_upload(upload_id: str, db: Session = Depends(get_db)):
+    """Elimina un upload non completato e il relativo file parziale"""
+    upload = _get_upload(db, upload_id)
+
+    if upload.status == "completed":
+        raise HTTPException(status_code=409, detail="Upload già completato")
+
+    discard_upload(upload_id)
+    db.delete(upload)
+    db.commit()
+    return {"message": "Upload annullato"}
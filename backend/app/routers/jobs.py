@@ -0,0 +1,187 @@
+from typing import Dict, Optional
+from fastapi import APIRouter, HTTPException, Depends, WebSocket, WebSocketDisconnect
+from sqlalchemy.orm import Session
+from sqlalchemy.future import select
+from sqlalchemy import update
+from starlette.concurrency import run_in_threadpool
+from app.celery_worker import celery
+from app.database import get_db, SessionLocal
+from app.models.tasks import Task, TaskStatus
+from app.models.transcripts import Transcript
+from app.models.transcription_chunks import TranscriptionChunk
+from app.services.job_events import job_event_subscription, next_job_event, publish_job_event
+from app.services.transcription_pipeline import piece_event
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+# Tipi di job il cui worker verifica la richiesta di annullamento
+CANCELLABLE_JOB_TYPES = ("summary",)
+
+# Stato di un job in background (trascrizione, verbale, ...)
+@router.get("/{job_id}")
+def get_job(job_id: int, db: Session = Depends(get_db)):
+    """Restituisce stato, risultato ed eventuale errore di un job"""
+    task = db.execute(select(Task).filter(Task.id == job_id)).scalar_one_or_none()
+
+    if not task:
+        raise HTTPException(status_code=404, detail="Job non trovato")
+
+    return {
+        "job_id": task.id,
+        "type": task.type,
+        "status": task.status.value,
+        "audio_file_id": task.audio_file_id,
+        "transcript_id": task.transcript_id,
+        "result": task.result,
+        "error_message": task.error_message,
+        "progress": task.progress,
+        "progress_message": task.progress_message,
+        "cancel_requested": task.cancel_requested,
+        "created_at": task.created_at,
+        "updated_at": task.updated_at
+    }
+
+
+# Annullamento di un job in background
+@router.post("/{job_id}/cancel", status_code=202)
+def cancel_job(job_id: int, db: Session = Depends(get_db)):
+    """
+    Un job ancora in coda viene annullato subito; per uno in corso viene registrata la richiesta,
+    che il worker verifica tra una fase e l'altra (lo stato passa poi a 'cancelled').
+    """
+    task = db.execute(select(Task).filter(Task.id == job_id)).scalar_one_or_none()
+
+    if not task:
+        raise HTTPException(status_code=404, detail="Job non trovato")
+
+    if task.type not in CANCELLABLE_JOB_TYPES:
+        raise HTTPException(status_code=409, detail=f"I job di tipo '{task.type}' non possono essere annullati")
+
+    if task.status not in (TaskStatus.pending, TaskStatus.processing):
+        raise HTTPException(status_code=409, detail=f"Job già concluso (stato: {task.status.value})")
+
+    # Update condizionato: il worker potrebbe aver cambiato stato nel frattempo
+    values = {"cancel_requested": True}
+    if task.status == TaskStatus.pending:
+        values.update(status=TaskStatus.cancelled, progress_message="Annullato")
+    updated = db.execute(
+        update(Task).where(Task.id == job_id, Task.status == task.status).values(**values)
+    ).rowcount
+    db.commit()
+
+    if not updated:
+        raise HTTPException(status_code=409, detail="Stato del job cambiato, riprovare")
+
+    if task.status == TaskStatus.pending:
+        if task.celery_task_id:
+            celery.control.revoke(task.celery_task_id)
+        publish_job_event(job_id, {"type": "cancelled"})
+
+    db.refresh(task)
+    return {
+        "message": "Annullamento richiesto",
+        "job_id": task.id,
+        "status": task.status.value,
+        "cancel_requested": task.cancel_requested
+    }
+
+
+def _job_snapshot(job_id: int) -> Optional[Dict]:
+    """
+    Stato del job con gli eventi già avvenuti: pezzi di trascrizione completati (prefisso contiguo,
+    in ordine di tempo) oppure l'ultimo avanzamento di un verbale in generazione
+    """
+    db = SessionLocal()
+    try:
+        task = db.execute(select(Task).filter(Task.id == job_id)).scalar_one_or_none()
+        if not task:
+            return None
+
+        events = []
+        if task.type == "summary" and task.status == TaskStatus.processing:
+            events.append({
+                "job_id": job_id,
+                "type": "progress",
+                "progress": task.progress,
+                "message": task.progress_message
+            })
+        elif task.type == "transcription" and task.transcript_id:
+            plan = db.execute(
+                select(Transcript.chunk_plan).filter(Transcript.id == task.transcript_id)
+            ).scalar_one_or_none() or []
+            chunks = db.execute(
+                select(TranscriptionChunk)
+                .where(TranscriptionChunk.transcript_id == task.transcript_id)
+                .order_by(TranscriptionChunk.chunk_number)
+            ).scalars().all()
+            for expected, chunk in enumerate(chunks):
+                if chunk.chunk_number != expected:
+                    break
+                events.append({"job_id": job_id, **piece_event(chunk, len(plan))})
+
+        return {
+            "status": task.status,
+            "transcript_id": task.transcript_id,
+            "result": task.result,
+            "error_message": task.error_message,
+            "events": events
+        }
+    finally:
+        db.close()
+
+# Avanzamento di un job in tempo reale: i pezzi di trascrizione vengono inviati appena completati
+@router.websocket("/{job_id}/events")
+async def job_events_websocket(websocket: WebSocket, job_id: int):
+    """
+    Invia prima i pezzi già completati, poi quelli nuovi in ordine di tempo
+    (messaggi 'partial_transcript') o l'avanzamento ('progress'), infine 'completed', 'failed' o 'cancelled'.
+    I client possono ricevere due volte lo stesso pezzo: va identificato con chunk_number.
+    """
+    await websocket.accept()
+    try:
+        # Iscrizione prima di leggere lo stato, così nessun evento va perso nel frattempo
+        async with job_event_subscription(job_id) as subscription:
+            snapshot = await run_in_threadpool(_job_snapshot, job_id)
+            if snapshot is None:
+                await websocket.send_json({"type": "error", "message": "Job non trovato"})
+                await websocket.close()
+                return
+
+            for event in snapshot["events"]:
+                await websocket.send_json(event)
+
+            if snapshot["status"] == TaskStatus.completed:
+                await websocket.send_json({
+                    "job_id": job_id,
+                    "type": "completed",
+                    "transcript_id": snapshot["transcript_id"],
+                    "result": snapshot["result"]
+                })
+                await websocket.close()
+                return
+            if snapshot["status"] == TaskStatus.failed:
+                await websocket.send_json({"job_id": job_id, "type": "failed", "error_message": snapshot["error_message"]})
+                await websocket.close()
+                return
+            if snapshot["status"] == TaskStatus.cancelled:
+                await websocket.send_json({"job_id": job_id, "type": "cancelled"})
+                await websocket.close()
+                return
+
+            while True:
+                event = await next_job_event(subscription)
+                if event is None:
+                    # Nessun evento di recente: il ping rileva i client disconnessi
+                    await websocket.send_json({"type": "ping"})
+                    continue
+
+                await websocket.send_json(event)
+                if event.get("type") in ("completed", "failed", "cancelled"):
+                    await websocket.close()
+                    return
+
+    except WebSocketDisconnect:
+        print(f"🔌 Client disconnesso dagli eventi del job {job_id}")
+    except Exception as e:
+        # Invio fallito su una connessione già chiusa dal client
+        print(f"❌ Connessione agli eventi del job {job_id} interrotta: {e}")
@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.prompts import Prompt
+from app.services.prompt_cache import prompt_cache
 
 router = APIRouter(prefix="/api/prompts", tags=["Prompts"])
 
@@ -14,7 +15,9 @@ def get_prompt(prompt_id: int, db: Session = Depends(get_db)):
     return {
         "id": prompt.id,
         "name": prompt.name,
-        "content": prompt.prompt
+        "content": prompt.prompt,
+        "version": prompt.version,
+        "updated_at": prompt.updated_at
     }
 
 # PUT: Aggiorna un prompt esistente
@@ -24,11 +27,18 @@ def update_prompt(prompt_id: int, data: dict, db: Session = Depends(get_db)):
     if not prompt:
         raise HTTPException(status_code=404, detail="Prompt non trovato")
     
+    # Versione incrementata a DB (update atomico anche con modifiche contemporanee)
     prompt.prompt = data.get("content", prompt.prompt)
+    prompt.version = Prompt.version + 1
     db.commit()
     db.refresh(prompt)
+
+    # Le copie in cache di tutti i processi (API e worker) vengono scartate
+    prompt_cache.publish_invalidation(prompt.id, prompt.version)
     return {
         "message": "Prompt aggiornato con successo",
         "id": prompt.id,
-        "content": prompt.prompt
+        "content": prompt.prompt,
+        "version": prompt.version,
+        "updated_at": prompt.updated_at
     }
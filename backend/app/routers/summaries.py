@@ -8,7 +8,8 @@ from app.models.verbs import Verbs
 from pydantic import BaseModel
 from app.routers.websocket_manager import websocket_manager
 from app.models.transcripts import Transcript
-from app.services.summarizer import generate_summary
+from app.models.tasks import Task, TaskStatus
+from app.tasks.summary_tasks import generate_summary_task
 from app.utils.post_processing import parse_odv_summary, fill_odv_template, parse_to_tiptap_json, estrai_sezioni_verbale
 from app.utils.onedrive_utils import onedrive_integration, OneDriveFileManager
 from datetime import datetime
@@ -28,40 +29,64 @@ class VerbaleFields(BaseModel):
     ORARIO_INIZIO: str
     ORARIO_FINE: str
 
-# API che genera il riassunto della trascrizione
-@router.post("/summary/start/{transcript_id}")
+# API che avvia la generazione del verbale in background
+@router.post("/summary/start/{transcript_id}", status_code=202)
 def summarize_transcription(transcript_id: int, db: Session = Depends(get_db)):
-    try: 
-        result = db.execute(select(Transcript).filter(Transcript.id == transcript_id))
-        transcript = result.scalar_one_or_none()
+    """
+    Accoda la generazione del verbale su Celery e restituisce subito l'ID del job.
+    Avanzamento su GET /jobs/{job_id}; a job completato result contiene l'ID del verbale.
+    """
+    transcript = db.execute(
+        select(Transcript.id, Transcript.transcript_text).filter(Transcript.id == transcript_id)
+    ).first()
 
-        if not transcript:
-            print(f"Trascrizione con ID {transcript_id} non trovata nel database.")
-            raise HTTPException(status_code=404, detail="Trascrizione non trovata")
+    if not transcript:
+        print(f"Trascrizione con ID {transcript_id} non trovata nel database.")
+        raise HTTPException(status_code=404, detail="Trascrizione non trovata")
 
-        if not transcript.transcript_text:
-            raise HTTPException(status_code=400, detail="Testo della trascrizione mancante")
+    if not transcript.transcript_text:
+        raise HTTPException(status_code=400, detail="Testo della trascrizione mancante")
 
-        summary = generate_summary(transcript.transcript_text)
-                
-        try:
-            new_verbs = Verbs(
-                transcript_id=transcript_id,
-                verbs_text=summary,
-                created_at=datetime.utcnow()
-            )
+    # Un verbale già in generazione per la stessa trascrizione non viene richiesto di nuovo
+    running = db.execute(
+        select(Task)
+        .where(
+            Task.type == "summary",
+            Task.transcript_id == transcript_id,
+            Task.status.in_([TaskStatus.pending, TaskStatus.processing]),
+            Task.cancel_requested.is_(False)
+        )
+        .order_by(Task.id.desc())
+        .limit(1)
+    ).scalar_one_or_none()
+    if running:
+        return {
+            "message": "Verbale già in generazione",
+            "job_id": running.id,
+            "status": running.status.value,
+            "transcript_id": transcript_id
+        }
 
-            db.add(new_verbs)
-            db.commit()
-            db.refresh(new_verbs)
-        except Exception as e:
-            print(f"❌ Errore durante il processo: {e}")
+    try:
+        task = Task(type="summary", status=TaskStatus.pending, transcript_id=transcript_id)
+        db.add(task)
+        db.commit()
+        db.refresh(task)
 
-        return new_verbs.id
-    
+        async_result = generate_summary_task.delay(task.id)
+        task.celery_task_id = async_result.id
+        db.commit()
     except Exception as e:
+        db.rollback()
         print(f"❌ Eccezione nell'endpoint summary/start/ : {e}")
-        raise HTTPException(status_code=500, detail=f"Errore durante il riassunto: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Errore durante l'avvio del riassunto: {str(e)}")
+
+    return {
+        "message": "Generazione del verbale avviata",
+        "job_id": task.id,
+        "status": task.status.value,
+        "transcript_id": transcript_id
+    }
 
 # API che recupera un riassunto
 @router.get("/summary/{summary_id}")
@@ -7,18 +7,21 @@ from fastapi import APIRouter, HTTPException, Depends, Query
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy.future import select
-from sqlalchemy import update
+from sqlalchemy import update, func
 from app.database import get_db
 from app.models.audio_files import AudioFile
 from app.models.transcripts import Transcript
+from app.models.transcription_chunks import TranscriptionChunk
 from app.models.tasks import Task, TaskStatus
 from pydantic import BaseModel
 from app.routers.websocket_manager import websocket_manager
 from app.utils.post_processing import format_transcription, convert_html_to_word_template
-from app.services.transcriber import transcribe_audio
+from app.services.audio_dedup import latest_transcript_id
+from app.services.transcription_cache import get_cached_transcription
+from app.utils.segments import SEGMENT_FIELDS, DIAGNOSTIC_FIELDS, select_segment_fields
+from app.tasks.transcription_tasks import transcribe_audio_task, is_stale_job
 from app.utils.onedrive_utils import onedrive_integration
 from fastapi import UploadFile
-from pydub import AudioSegment
 
 router = APIRouter()
 
@@ -30,20 +33,50 @@ class OneDriveUploadRequest(BaseModel):
 
 # Recupera una trascrizione
 @router.get("/transcriptions/{transcript_id}")
-def get_transcription(transcript_id: int, db: Session = Depends(get_db)):
-    result = db.execute(select(Transcript).filter(Transcript.id == transcript_id))
-    transcription = result.scalar_one_or_none()
+def get_transcription(
+    transcript_id: int,
+    fields: str = Query(
+        "start,end,text",
+        description="Campi dei segmenti separati da virgola (start, end, text, avg_logprob, "
+                    "compression_ratio, no_speech_prob, temperature); vuoto per non includerli"
+    ),
+    layout: str = Query("columns", description="'columns' (array paralleli) oppure 'rows' (un oggetto per segmento)"),
+    db: Session = Depends(get_db)
+):
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in SEGMENT_FIELDS + DIAGNOSTIC_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Campi non validi: {', '.join(unknown)}")
+    if layout not in ("columns", "rows"):
+        raise HTTPException(status_code=400, detail="Layout non valido. Usa 'columns' o 'rows'.")
+
+    # Segmenti e diagnostici vengono letti solo se richiesti
+    columns = [Transcript.id, Transcript.transcript_text, Transcript.audio_id, Transcript.created_at, Transcript.status]
+    if requested:
+        columns.append(Transcript.segments)
+    if any(field in DIAGNOSTIC_FIELDS for field in requested):
+        columns.append(Transcript.segment_diagnostics)
+
+    transcription = db.execute(select(*columns).filter(Transcript.id == transcript_id)).first()
 
     if not transcription:
         raise HTTPException(status_code=404, detail="Trascrizione non trovata")
 
-    return {
+    response_data = {
         "transcript_id": transcription.id,
         "transcript_text": transcription.transcript_text,
         "audio_id": transcription.audio_id,
         "created_at": transcription.created_at, 
-        "segments": transcription.segments
+        "status": transcription.status
     }
+    if requested:
+        response_data["segments"] = select_segment_fields(
+            transcription.segments,
+            getattr(transcription, "segment_diagnostics", None),
+            requested,
+            layout
+        )
+    return response_data
 
 # Salva automaticamente le modifiche alla trascrizione
 @router.put("/transcriptions/{transcript_id}")
@@ -60,57 +93,148 @@ def update_transcription(transcript_id: int, request: TranscriptUpdateRequest, d
     websocket_manager.send_notification("Modifiche salvate")
     return {"message": "Trascrizione aggiornata con successo!"}
 
-# API che esegue la trascrizione
-@router.post("/start-transcription/{audio_file_id}")
-def start_transcription_endpoint(audio_file_id: int, db: Session = Depends(get_db)):
+# API che avvia la trascrizione come job in background
+@router.post("/start-transcription/{audio_file_id}", status_code=202)
+def start_transcription_endpoint(
+    audio_file_id: int,
+    force: bool = Query(False, description="Ripete la trascrizione ignorando risultati esistenti e cache"),
+    db: Session = Depends(get_db)
+):
+    """Accoda la trascrizione su Celery e restituisce subito l'ID del job (stato su GET /jobs/{job_id})"""
+    audio_file = db.execute(
+        select(AudioFile.id, AudioFile.content_hash).filter(AudioFile.id == audio_file_id)
+    ).first()
+
+    if not audio_file:
+        print(f"❌ File audio con ID {audio_file_id} non trovato nel database.")
+        raise HTTPException(status_code=404, detail="File audio non trovato")
+
+    # Stesso contenuto già trascritto (anche se caricato da un altro utente) con modello, lingua e
+    # pre-elaborazione correnti: si riusa il risultato. Dopo un cambio di modello o del VAD si ritrascrive
+    if not force:
+        existing_transcript_id = latest_transcript_id(db, audio_file.content_hash)
+        if existing_transcript_id:
+            print(f"♻️ Trascrizione {existing_transcript_id} riutilizzata per l'audio {audio_file_id}")
+            return {
+                "message": "Trascrizione già disponibile per questo audio",
+                "status": TaskStatus.completed.value,
+                "transcript_id": existing_transcript_id,
+                "audio_file_id": audio_file.id,
+                "reused": True
+            }
+
+        # Stesso contenuto, modello, lingua e pre-elaborazione già trascritti: risultato dalla cache, senza job
+        cached = get_cached_transcription(db, audio_file.content_hash)
+        if cached:
+            transcript = Transcript(
+                audio_id=audio_file.id,
+                transcript_text=cached.transcript_text,
+                segments=cached.segments,
+                model=cached.model,
+                language=cached.language,
+                preprocessing_version=cached.preprocessing_version,
+                status="completed",
+                created_at=datetime.utcnow()
+            )
+            db.add(transcript)
+            db.commit()
+            print(f"⚡ Trascrizione dell'audio {audio_file_id} servita dalla cache")
+            return {
+                "message": "Trascrizione disponibile dalla cache",
+                "status": TaskStatus.completed.value,
+                "transcript_id": transcript.id,
+                "audio_file_id": audio_file.id,
+                "cached": True
+            }
+
     try:
-        # Cerca il file audio nel database
-        result = db.execute(select(AudioFile).filter(AudioFile.id == audio_file_id))
-        audio_file = result.scalar_one_or_none()
+        task = Task(type="transcription", status=TaskStatus.pending, audio_file_id=audio_file.id)
+        db.add(task)
+        db.commit()
+        db.refresh(task)
 
-        if not audio_file:
-            print(f"❌ File audio con ID {audio_file_id} non trovato nel database.")
-            raise HTTPException(status_code=404, detail="File audio non trovato")
-        
-        # Conversione in .mp3 mono 16kHz
-        original = AudioSegment.from_file(io.BytesIO(audio_file.file_data))
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as temp_file:
-            original.set_channels(1).set_frame_rate(16000).export(temp_file.name, format="mp3")
-            temp_path = temp_file.name
-
-        # Trascrizione con API OpenAI
-        result_json = transcribe_audio(temp_path)
-        print(f"result json ----> {result_json}")
-        os.remove(temp_path)
-
-        # Ottieni la trascrizione grezza
-        raw_transcription = result_json.get("transcription")
-        segments = result_json.get("segments")
-        if not raw_transcription:
-            raise HTTPException(status_code=500, detail="Trascrizione non trovata nella risposta")
-
-        # Formatta la trascrizione
-        formatted_segments = segments
-        formatted_transcription = format_transcription(raw_transcription)
-
-        # Salva la trascrizione nel DB
-        new_transcript = Transcript(
-            audio_id=audio_file.id,
-            transcript_text=formatted_transcription,
-            segments=formatted_segments,
-            created_at=datetime.utcnow()
+        # force: anche il job ignora la cache e la aggiorna con il nuovo risultato
+        async_result = transcribe_audio_task.delay(task.id, force=force)
+        task.celery_task_id = async_result.id
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Errore durante l'avvio della trascrizione: {str(e)}")
+
+    return {
+        "message": "Trascrizione avviata",
+        "job_id": task.id,
+        "status": task.status.value,
+        "audio_file_id": audio_file.id
+    }
+
+# Riprende una trascrizione interrotta: vengono trascritti solo i pezzi mancanti
+@router.post("/transcriptions/{transcript_id}/resume", status_code=202)
+def resume_transcription(transcript_id: int, db: Session = Depends(get_db)):
+    """Accoda un job che completa la trascrizione riusando i pezzi già salvati"""
+    transcript = db.execute(
+        select(Transcript.id, Transcript.audio_id, Transcript.status).filter(Transcript.id == transcript_id)
+    ).first()
+
+    if not transcript:
+        raise HTTPException(status_code=404, detail="Trascrizione non trovata")
+
+    if transcript.status not in ("processing", "failed"):
+        raise HTTPException(status_code=409, detail="Trascrizione già completata")
+
+    # Un solo job alla volta per la stessa trascrizione; un job rimasto attivo dopo il crash
+    # del worker viene chiuso come fallito (una sua riconsegna successiva viene ignorata)
+    running = db.execute(
+        select(Task).where(
+            Task.transcript_id == transcript_id,
+            Task.status.in_([TaskStatus.pending, TaskStatus.processing])
+        ).order_by(Task.id.desc()).limit(1)
+    ).scalar_one_or_none()
+    if running:
+        if not is_stale_job(running):
+            return {
+                "message": "Trascrizione già in corso",
+                "job_id": running.id,
+                "transcript_id": transcript_id
+            }
+        print(f"⚠️ Job {running.id} senza aggiornamenti: considerato interrotto")
+        db.execute(
+            update(Task).where(
+                Task.id == running.id,
+                Task.status.in_([TaskStatus.pending, TaskStatus.processing])
+            ).values(status=TaskStatus.failed, error_message="Job interrotto (worker non più attivo)")
         )
-        db.add(new_transcript)
         db.commit()
-        db.refresh(new_transcript)
 
-        return {
-            "message": "Trascrizione completata con successo!",
-            "transcript_id": new_transcript.id,
-            "audio_file_id": audio_file.id
-        }
+    completed_chunks = db.execute(
+        select(func.count(TranscriptionChunk.id)).where(TranscriptionChunk.transcript_id == transcript_id)
+    ).scalar_one()
+
+    try:
+        task = Task(
+            type="transcription",
+            status=TaskStatus.pending,
+            audio_file_id=transcript.audio_id,
+            transcript_id=transcript_id
+        )
+        db.add(task)
+        db.commit()
+        db.refresh(task)
+
+        async_result = transcribe_audio_task.delay(task.id)
+        task.celery_task_id = async_result.id
+        db.commit()
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Errore durante la trascrizione: {str(e)}")
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Errore durante la ripresa della trascrizione: {str(e)}")
+
+    return {
+        "message": "Ripresa della trascrizione avviata",
+        "job_id": task.id,
+        "status": task.status.value,
+        "transcript_id": transcript_id,
+        "completed_chunks": completed_chunks
+    }
 
 # API che converte la trascrizione in word e gestisce download/OneDrive
 @router.post("/transcriptions/{transcript_id}/word")
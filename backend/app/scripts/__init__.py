@@ -0,0 +1 @@
+# Comandi di manutenzione eseguibili con python -m app.scripts.<nome>
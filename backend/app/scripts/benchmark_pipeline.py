@@ -0,0 +1,112 @@
+"""
+Benchmark della pipeline completa: ingest → transcodifica → trascrizione → salvataggio.
+
+Per default usa il motore di trascrizione locale "fake" (nessuna chiamata di rete), così il
+risultato misura solo la pipeline; la velocità del motore si regola con --speed.
+Ogni file viene caricato come un nuovo upload; i record creati vengono eliminati al termine
+(salvo --keep), i blob restano nello store perché indirizzati per contenuto.
+
+Uso:
+    python -m app.scripts.benchmark_pipeline registrazione1.mp3 registrazione2.m4a --speed 100
+"""
+import os
+
+# Il motore va scelto prima di importare i servizi (istanza creata all'import)
+os.environ.setdefault("TRANSCRIPTION_ENGINE", "fake")
+
+import argparse
+import shutil
+import tempfile
+import time
+from typing import Dict
+from sqlalchemy import delete
+from app.database import SessionLocal
+from app.models.audio_files import AudioFile
+from app.models.transcripts import Transcript
+from app.models.transcription_chunks import TranscriptionChunk
+from app.services import transcriber
+from app.services.audio_storage import AUDIO_STORAGE_DIR, store_local_file
+from app.services.audio_ingest import build_audio_record, ensure_canonical_audio
+from app.services.transcription_pipeline import create_pending_transcript, run_transcription
+from app.utils.segments import segment_count
+
+
+def benchmark_file(path: str, keep: bool) -> Dict:
+    """Esegue la pipeline su un file e restituisce la durata di ogni fase in secondi"""
+    db = SessionLocal()
+    audio_file = None
+    transcript = None
+    try:
+        started = time.perf_counter()
+
+        # Ingest: copia nello staging come un upload, hash, blob store e metadati
+        os.makedirs(AUDIO_STORAGE_DIR, exist_ok=True)
+        fd, staging_path = tempfile.mkstemp(dir=AUDIO_STORAGE_DIR, suffix=".part")
+        os.close(fd)
+        shutil.copyfile(path, staging_path)
+        stored = store_local_file(staging_path)
+        audio_file = build_audio_record(os.path.basename(path), stored)
+        db.add(audio_file)
+        db.commit()
+        ingested = time.perf_counter()
+
+        ensure_canonical_audio(db, audio_file)
+        transcoded = time.perf_counter()
+
+        # force=True: la cache non deve falsare la misura
+        transcript = create_pending_transcript(db, audio_file)
+        transcript = run_transcription(db, audio_file, transcript, force=True)
+        transcribed = time.perf_counter()
+
+        return {
+            "file": os.path.basename(path),
+            "audio_seconds": audio_file.duration_seconds or 0.0,
+            "ingest": ingested - started,
+            "transcode": transcoded - ingested,
+            "transcribe_persist": transcribed - transcoded,
+            "total": transcribed - started,
+            "segments": segment_count(transcript.segments)
+        }
+    finally:
+        if not keep:
+            db.rollback()
+            if transcript is not None:
+                db.execute(delete(TranscriptionChunk).where(TranscriptionChunk.transcript_id == transcript.id))
+                db.execute(delete(Transcript).where(Transcript.id == transcript.id))
+            if audio_file is not None and audio_file.id is not None:
+                db.execute(delete(AudioFile).where(AudioFile.id == audio_file.id))
+            db.commit()
+        db.close()
+
+
+def run(paths, speed: float, keep: bool):
+    engine = transcriber.transcription_engine
+    if isinstance(engine, transcriber.FakeTranscriptionEngine):
+        engine.speed = speed
+    print(f"🏁 Benchmark con motore '{engine.name}' ({engine.model})")
+
+    results = []
+    for path in paths:
+        result = benchmark_file(path, keep)
+        results.append(result)
+        print(
+            f"  {result['file']}: {result['audio_seconds']:.0f}s di audio, "
+            f"ingest {result['ingest']:.2f}s, transcodifica {result['transcode']:.2f}s, "
+            f"trascrizione+salvataggio {result['transcribe_persist']:.2f}s, totale {result['total']:.2f}s"
+        )
+
+    audio_seconds = sum(result["audio_seconds"] for result in results)
+    total = sum(result["total"] for result in results)
+    if total > 0:
+        print(f"✅ {len(results)} file, {audio_seconds:.0f}s di audio in {total:.2f}s ({audio_seconds / total:.1f}x tempo reale)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark offline della pipeline di trascrizione")
+    parser.add_argument("paths", nargs="+", help="File audio da elaborare")
+    parser.add_argument("--speed", type=float, default=transcriber.FAKE_TRANSCRIPTION_SPEED,
+                        help="Secondi di audio trascritti per secondo dal motore fake (0 = nessuna attesa)")
+    parser.add_argument("--keep", action="store_true", help="Conserva i record creati nel database")
+    args = parser.parse_args()
+
+    run(args.paths, args.speed, args.keep)
@@ -0,0 +1,60 @@
+"""
+Converte i segmenti delle trascrizioni esistenti nel formato compatto (array paralleli).
+
+I record salvati prima del formato compatto contengono la lista di oggetti restituita da Whisper,
+con token e campi diagnostici per ogni segmento. Le righe vengono elaborate a lotti ordinati
+per ID; i campi diagnostici vengono spostati in segment_diagnostics (salvo --drop-diagnostics).
+
+Uso:
+    python -m app.scripts.compact_segments --batch-size 50
+"""
+import argparse
+from sqlalchemy import update
+from sqlalchemy.future import select
+from app.database import SessionLocal
+from app.models.transcripts import Transcript
+from app.utils.segments import pack_segments, split_diagnostics
+
+
+def compact(batch_size: int, keep_diagnostics: bool):
+    db = SessionLocal()
+    try:
+        compacted = 0
+        last_id = 0
+        while True:
+            rows = db.execute(
+                select(Transcript.id, Transcript.segments)
+                .where(Transcript.id > last_id, Transcript.segments.isnot(None))
+                .order_by(Transcript.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+
+            for row in rows:
+                # Solo il formato precedente (lista di oggetti) va convertito
+                if not isinstance(row.segments, list):
+                    continue
+                segments, diagnostics = split_diagnostics(pack_segments(row.segments, keep_diagnostics))
+                db.execute(
+                    update(Transcript)
+                    .where(Transcript.id == row.id)
+                    .values(segments=segments, segment_diagnostics=diagnostics)
+                )
+                compacted += 1
+
+            db.commit()
+            last_id = rows[-1].id
+
+        print(f"✅ Conversione completata: {compacted} trascrizioni in formato compatto")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Converte i segmenti delle trascrizioni nel formato compatto")
+    parser.add_argument("--batch-size", type=int, default=50, help="Trascrizioni elaborate per lotto")
+    parser.add_argument("--drop-diagnostics", action="store_true", help="Non conserva i campi diagnostici")
+    args = parser.parse_args()
+
+    compact(args.batch_size, not args.drop_diagnostics)
@@ -0,0 +1,59 @@
+"""
+Riepilogo delle chiamate ai modelli registrate in llm_calls: per operazione e modello, numero di
+chiamate, token (stimati e conteggiati dal provider), durata e chiamate troncate o fallite.
+
+Uso:
+    python -m app.scripts.llm_usage_report --days 7
+"""
+import argparse
+from datetime import datetime, timedelta
+from sqlalchemy import func, case
+from sqlalchemy.future import select
+from app.database import SessionLocal
+from app.models.llm_calls import LLMCall
+
+
+def report(days: int):
+    db = SessionLocal()
+    try:
+        since = datetime.utcnow() - timedelta(days=days)
+        rows = db.execute(
+            select(
+                LLMCall.operation,
+                LLMCall.model,
+                func.count(LLMCall.id).label("calls"),
+                func.sum(LLMCall.estimated_input_tokens).label("estimated_input_tokens"),
+                func.sum(LLMCall.input_tokens).label("input_tokens"),
+                func.sum(LLMCall.output_tokens).label("output_tokens"),
+                func.avg(LLMCall.duration_ms).label("avg_duration_ms"),
+                func.max(LLMCall.duration_ms).label("max_duration_ms"),
+                func.sum(case((LLMCall.truncated.is_(True), 1), else_=0)).label("truncated"),
+                func.sum(case((LLMCall.success.is_(False), 1), else_=0)).label("failed")
+            )
+            .where(LLMCall.created_at >= since)
+            .group_by(LLMCall.operation, LLMCall.model)
+            .order_by(func.sum(LLMCall.duration_ms).desc())
+        ).all()
+
+        if not rows:
+            print(f"ℹ️ Nessuna chiamata registrata negli ultimi {days} giorni")
+            return
+
+        print(f"📊 Chiamate ai modelli negli ultimi {days} giorni")
+        for row in rows:
+            print(
+                f"  {row.operation} ({row.model}): {row.calls} chiamate, "
+                f"input {row.input_tokens or 0} token (stimati {row.estimated_input_tokens or 0}), "
+                f"output {row.output_tokens or 0} token, durata media {(row.avg_duration_ms or 0) / 1000:.1f}s "
+                f"(max {(row.max_duration_ms or 0) / 1000:.1f}s), troncate {row.truncated or 0}, fallite {row.failed or 0}"
+            )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Riepilogo di token e durata delle chiamate ai modelli")
+    parser.add_argument("--days", type=int, default=7, help="Giorni da considerare")
+    args = parser.parse_args()
+
+    report(args.days)
@@ -0,0 +1,103 @@
+"""
+Sposta i file audio dal database (audio_files.file_data) al blob store.
+
+Le righe vengono elaborate a lotti ordinati per ID e ogni LONGBLOB viene letto
+a blocchi con SUBSTRING(), quindi né la tabella né un singolo file vengono mai
+caricati interamente in memoria.
+
+Uso:
+    python -m app.scripts.migrate_audio_blobs --batch-size 20
+"""
+import argparse
+import os
+import tempfile
+from sqlalchemy import func, update
+from sqlalchemy.future import select
+from app.database import SessionLocal
+from app.models.audio_files import AudioFile
+from app.services.audio_storage import AUDIO_STORAGE_DIR, UPLOAD_CHUNK_SIZE, store_local_file
+from app.services.audio_ingest import probe_stored_audio
+
+
+def _pending_ids(db, after_id: int, batch_size: int):
+    stmt = (
+        select(AudioFile.id)
+        .where(AudioFile.file_data.isnot(None), AudioFile.id > after_id)
+        .order_by(AudioFile.id)
+        .limit(batch_size)
+    )
+    return db.execute(stmt).scalars().all()
+
+
+def _migrate_row(db, audio_id: int, chunk_size: int):
+    """Copia il blob di una riga in un file temporaneo a blocchi e lo sposta nel blob store"""
+    total = db.execute(
+        select(func.length(AudioFile.file_data)).where(AudioFile.id == audio_id)
+    ).scalar_one()
+
+    os.makedirs(AUDIO_STORAGE_DIR, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=AUDIO_STORAGE_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            # SUBSTRING è 1-based
+            position = 1
+            while position <= total:
+                chunk = db.execute(
+                    select(func.substring(AudioFile.file_data, position, chunk_size))
+                    .where(AudioFile.id == audio_id)
+                ).scalar_one()
+                out.write(chunk)
+                position += chunk_size
+
+        stored = store_local_file(temp_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    db.execute(
+        update(AudioFile)
+        .where(AudioFile.id == audio_id)
+        .values(
+            storage_key=stored["storage_key"],
+            file_size=stored["file_size"],
+            content_hash=stored["content_hash"],
+            file_data=None,
+            **probe_stored_audio(stored["storage_key"])
+        )
+    )
+    db.commit()
+    return stored
+
+
+def migrate(batch_size: int, chunk_size: int):
+    db = SessionLocal()
+    try:
+        migrated = 0
+        last_id = 0
+        while True:
+            ids = _pending_ids(db, last_id, batch_size)
+            if not ids:
+                break
+
+            for audio_id in ids:
+                stored = _migrate_row(db, audio_id, chunk_size)
+                migrated += 1
+                print(f"✅ Audio {audio_id} migrato ({stored['file_size']} byte, {stored['content_hash'][:12]})")
+
+            last_id = ids[-1]
+            # Nessun oggetto deve restare nella identity map tra un lotto e l'altro
+            db.expunge_all()
+
+        print(f"✅ Migrazione completata: {migrated} file audio spostati dal database")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migra i file audio dal database al blob store")
+    parser.add_argument("--batch-size", type=int, default=20, help="Righe elaborate per lotto")
+    parser.add_argument("--chunk-size", type=int, default=UPLOAD_CHUNK_SIZE, help="Byte letti per ogni SUBSTRING")
+    args = parser.parse_args()
+
+    migrate(args.batch_size, args.chunk_size)
@@ -0,0 +1,210 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Coroutine, Dict, Optional
+import google.generativeai as genai
+import httpx
+from openai import AsyncOpenAI
+from dotenv import load_dotenv
+from app.services.async_runner import run_sync, submit
+from app.services.llm_accounting import record_llm_call, usage_from_response
+
+load_dotenv()
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+
+# Richieste contemporanee per processo e timeout per chiamata, per provider
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "180"))
+# Per OpenAI valgono ancora le variabili WHISPER_* usate in precedenza dal trascrittore
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", os.getenv("WHISPER_MAX_CONCURRENCY", "8")))
+OPENAI_TIMEOUT_SECONDS = float(os.getenv("OPENAI_TIMEOUT_SECONDS", os.getenv("WHISPER_TIMEOUT_SECONDS", "300")))
+
+
+class ProviderLimiter:
+    """
+    Limite di concorrenza e timeout di un provider, con le metriche delle chiamate
+    (numero, errori, latenza, token) del processo.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, timeout_seconds: float):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.timeout_seconds = timeout_seconds
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._metrics = {
+            "calls": 0,
+            "errors": 0,
+            "timeouts": 0,
+            "in_flight": 0,
+            "total_latency_seconds": 0.0,
+            "max_latency_seconds": 0.0,
+            "input_tokens": 0,
+            "output_tokens": 0
+        }
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Uno per processo: dopo un fork il loop condiviso (e quindi il semaforo) è nuovo
+        with self._lock:
+            if self._semaphore is None or self._semaphore_pid != os.getpid():
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                self._semaphore_pid = os.getpid()
+            return self._semaphore
+
+    def _update(self, **deltas):
+        with self._lock:
+            for key, value in deltas.items():
+                self._metrics[key] += value
+
+    async def run(
+        self,
+        operation: str,
+        model: str,
+        make_call: Callable[[], Awaitable[Any]],
+        estimated_input_tokens: int = 0,
+        strategy: str = "single",
+        truncated: bool = False,
+        timeout: Optional[float] = None
+    ) -> Any:
+        """Esegue la chiamata entro il limite del provider, misurandola e registrandola in llm_calls"""
+        async with self._get_semaphore():
+            self._update(in_flight=1)
+            started = time.perf_counter()
+            response, error = None, None
+            try:
+                response = await asyncio.wait_for(make_call(), timeout=timeout or self.timeout_seconds)
+                return response
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                elapsed = time.perf_counter() - started
+                input_tokens, output_tokens = usage_from_response(response)
+                self._update(
+                    in_flight=-1,
+                    calls=1,
+                    errors=int(error is not None),
+                    timeouts=int(isinstance(error, asyncio.TimeoutError)),
+                    total_latency_seconds=elapsed,
+                    input_tokens=input_tokens or 0,
+                    output_tokens=output_tokens or 0
+                )
+                with self._lock:
+                    self._metrics["max_latency_seconds"] = max(self._metrics["max_latency_seconds"], elapsed)
+                # Scrittura a DB in un thread: il loop condiviso non si blocca
+                await asyncio.to_thread(
+                    record_llm_call, self.name, model, operation, strategy, estimated_input_tokens,
+                    elapsed, response=response, truncated=truncated, error=error
+                )
+
+    def stats(self) -> Dict:
+        with self._lock:
+            metrics = dict(self._metrics)
+        metrics["avg_latency_seconds"] = (
+            round(metrics["total_latency_seconds"] / metrics["calls"], 3) if metrics["calls"] else 0.0
+        )
+        metrics["total_latency_seconds"] = round(metrics["total_latency_seconds"], 3)
+        metrics["max_latency_seconds"] = round(metrics["max_latency_seconds"], 3)
+        return {"max_concurrency": self.max_concurrency, "timeout_seconds": self.timeout_seconds, **metrics}
+
+
+class AIGateway:
+    """
+    Punto unico di accesso ai provider AI: client creati una volta per processo e riutilizzati,
+    chiamate asincrone sul loop condiviso (async_runner) con limiti e metriche per provider.
+
+    Le coroutine del gateway vanno eseguite sul loop condiviso: dal codice sincrono con run(),
+    da un altro event loop (es. endpoint async di FastAPI) con await run_async().
+    """
+
+    def __init__(self):
+        self.gemini = ProviderLimiter("gemini", GEMINI_MAX_CONCURRENCY, GEMINI_TIMEOUT_SECONDS)
+        self.openai = ProviderLimiter("openai", OPENAI_MAX_CONCURRENCY, OPENAI_TIMEOUT_SECONDS)
+        self._gemini_models: Dict[str, genai.GenerativeModel] = {}
+        self._gemini_configured = False
+        self._openai_client: Optional[AsyncOpenAI] = None
+        self._lock = threading.Lock()
+
+    def gemini_model(self, model: str = GEMINI_MODEL) -> genai.GenerativeModel:
+        with self._lock:
+            if not self._gemini_configured:
+                genai.configure(api_key=GEMINI_API_KEY)
+                self._gemini_configured = True
+            if model not in self._gemini_models:
+                self._gemini_models[model] = genai.GenerativeModel(model)
+            return self._gemini_models[model]
+
+    def openai_client(self) -> AsyncOpenAI:
+        # Creato sul loop condiviso al primo utilizzo; i retry sono gestiti dai chiamanti, non dall'SDK
+        with self._lock:
+            if self._openai_client is None:
+                if not OPENAI_API_KEY:
+                    raise RuntimeError("❌ OPENAI_API_KEY mancante. Aggiungila nel file .env.")
+                self._openai_client = AsyncOpenAI(
+                    api_key=OPENAI_API_KEY,
+                    timeout=OPENAI_TIMEOUT_SECONDS,
+                    max_retries=0,
+                    http_client=httpx.AsyncClient(
+                        timeout=OPENAI_TIMEOUT_SECONDS,
+                        limits=httpx.Limits(
+                            max_connections=OPENAI_MAX_CONCURRENCY,
+                            max_keepalive_connections=OPENAI_MAX_CONCURRENCY,
+                            keepalive_expiry=60
+                        )
+                    )
+                )
+            return self._openai_client
+
+    async def gemini_generate(
+        self,
+        contents: Any,
+        operation: str,
+        model: str = GEMINI_MODEL,
+        estimated_input_tokens: int = 0,
+        strategy: str = "single",
+        truncated: bool = False
+    ):
+        """generate_content di Gemini (testo o [prompt, immagine]); restituisce la risposta dell'SDK"""
+        gemini_model = self.gemini_model(model)
+        return await self.gemini.run(
+            operation, model, lambda: gemini_model.generate_content_async(contents),
+            estimated_input_tokens=estimated_input_tokens, strategy=strategy, truncated=truncated
+        )
+
+    async def openai_call(
+        self,
+        operation: str,
+        model: str,
+        make_call: Callable[[AsyncOpenAI], Awaitable[Any]],
+        estimated_input_tokens: int = 0
+    ):
+        """Chiamata con il client OpenAI condiviso, es. lambda client: client.chat.completions.create(...)"""
+        client = self.openai_client()
+        return await self.openai.run(
+            operation, model, lambda: make_call(client), estimated_input_tokens=estimated_input_tokens
+        )
+
+    def chat_completion(self, operation: str, **kwargs) -> Any:
+        """chat.completions.create con il client OpenAI condiviso, dal codice sincrono"""
+        return self.run(self.openai_call(
+            operation, kwargs["model"], lambda client: client.chat.completions.create(**kwargs)
+        ))
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Esegue una coroutine del gateway dal codice sincrono (worker Celery, endpoint sync)"""
+        return run_sync(coro, timeout=timeout)
+
+    async def run_async(self, coro: Coroutine) -> Any:
+        """Esegue una coroutine del gateway da un altro event loop senza bloccarlo"""
+        return await asyncio.wrap_future(submit(coro))
+
+    def stats(self) -> Dict:
+        return {"gemini": self.gemini.stats(), "openai": self.openai.stats()}
+
+
+# Istanza globale
+ai_gateway = AIGateway()
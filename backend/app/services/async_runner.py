@@ -0,0 +1,37 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, Optional
+
+# Event loop condiviso del processo, in un thread dedicato: il codice sincrono (worker Celery,
+# endpoint sync) può usare client asincroni che restano aperti per tutta la vita del processo.
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_pid: Optional[int] = None
+_lock = threading.Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Restituisce il loop del processo, avviandolo al primo utilizzo (e di nuovo dopo un fork)"""
+    global _loop, _loop_pid
+    with _lock:
+        if _loop is None or _loop_pid != os.getpid():
+            _loop = asyncio.new_event_loop()
+            _loop_pid = os.getpid()
+            threading.Thread(target=_loop.run_forever, name="async-runner", daemon=True).start()
+        return _loop
+
+
+def submit(coro: Coroutine) -> Future:
+    """Esegue la coroutine sul loop condiviso e restituisce un Future di concurrent.futures"""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def run_sync(coro: Coroutine, timeout: Optional[float] = None) -> Any:
+    """Esegue la coroutine sul loop condiviso e ne attende il risultato dal thread chiamante"""
+    future = submit(coro)
+    try:
+        return future.result(timeout=timeout)
+    except BaseException:
+        future.cancel()
+        raise
@@ -0,0 +1,76 @@
+import os
+import subprocess
+import tempfile
+from typing import Optional
+from dotenv import load_dotenv
+from app.services.blob_store import blob_store
+
+load_dotenv()
+
+# Cache su disco delle clip già estratte, indicizzata per (hash audio, inizio, fine, formato)
+CLIP_CACHE_DIR = os.getenv("AUDIO_CLIP_CACHE_DIR", os.path.join("storage", "clips"))
+MAX_CLIP_SECONDS = float(os.getenv("AUDIO_CLIP_MAX_SECONDS", "300"))
+
+CLIP_FORMATS = {
+    "opus": {"extension": "ogg", "media_type": "audio/ogg", "codec_args": ["-c:a", "libopus", "-b:a", "32k"]},
+    "mp3": {"extension": "mp3", "media_type": "audio/mpeg", "codec_args": ["-c:a", "libmp3lame", "-b:a", "64k"]},
+}
+
+
+def clip_cache_path(content_hash: str, start_ms: int, end_ms: int, clip_format: str) -> str:
+    extension = CLIP_FORMATS[clip_format]["extension"]
+    return os.path.join(CLIP_CACHE_DIR, content_hash[:2], f"{content_hash}_{start_ms}_{end_ms}.{extension}")
+
+
+def cached_clip(content_hash: str, start: float, end: float, clip_format: str = "opus") -> Optional[str]:
+    """Percorso della clip se è già in cache, altrimenti None"""
+    path = clip_cache_path(content_hash, int(round(start * 1000)), int(round(end * 1000)), clip_format)
+    return path if os.path.exists(path) else None
+
+
+def extract_clip(storage_key: str, content_hash: str, start: float, end: float, clip_format: str = "opus") -> str:
+    """
+    Estrae l'intervallo [start, end] (secondi) e lo codifica come clip mono compatta.
+    Gli estremi sono arrotondati al millisecondo, così coincidono con quelli dei segmenti Whisper
+    e richieste ripetute riusano la stessa clip in cache.
+    storage_key è il blob da decodificare: la versione canonica se esiste, altrimenti l'originale.
+
+    Returns:
+        Percorso del file della clip
+    """
+    start_ms = int(round(start * 1000))
+    end_ms = int(round(end * 1000))
+    output_path = clip_cache_path(content_hash, start_ms, end_ms, clip_format)
+
+    if os.path.exists(output_path):
+        return output_path
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    extension = CLIP_FORMATS[clip_format]["extension"]
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(output_path), suffix=f".{extension}")
+    os.close(fd)
+
+    try:
+        with blob_store.local_file(storage_key) as source_path:
+            # -ss prima di -i: seek sul file in input senza decodificare la parte precedente
+            subprocess.run(
+                [
+                    "ffmpeg", "-v", "error", "-y",
+                    "-ss", f"{start_ms / 1000:.3f}",
+                    "-i", source_path,
+                    "-t", f"{(end_ms - start_ms) / 1000:.3f}",
+                    "-vn", "-ac", "1",
+                    *CLIP_FORMATS[clip_format]["codec_args"],
+                    temp_path
+                ],
+                capture_output=True,
+                check=True,
+                timeout=120
+            )
+        os.replace(temp_path, output_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return output_path
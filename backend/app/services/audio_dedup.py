@@ -0,0 +1,57 @@
+from typing import Dict, Optional
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+from app.models.audio_files import AudioFile
+from app.models.transcripts import Transcript
+from app.models.verbs import Verbs
+from app.services.transcription_cache import transcription_key
+
+
+def find_duplicate_audio(db: Session, content_hash: str) -> Optional[AudioFile]:
+    """Primo AudioFile già caricato con lo stesso contenuto (SHA-256)"""
+    if not content_hash:
+        return None
+    return db.execute(
+        select(AudioFile)
+        .where(AudioFile.content_hash == content_hash)
+        .order_by(AudioFile.id)
+        .limit(1)
+    ).scalar_one_or_none()
+
+
+def latest_transcript_id(db: Session, content_hash: str) -> Optional[int]:
+    """
+    Ultima trascrizione completata di un qualsiasi AudioFile con questo contenuto, prodotta con
+    modello, lingua e pre-elaborazione correnti (stessa chiave della cache delle trascrizioni)
+    """
+    if not content_hash:
+        return None
+    key = transcription_key()
+    return db.execute(
+        select(Transcript.id)
+        .join(AudioFile, Transcript.audio_id == AudioFile.id)
+        .where(
+            AudioFile.content_hash == content_hash,
+            Transcript.transcript_text.isnot(None),
+            Transcript.model == key["model"],
+            Transcript.language == key["language"],
+            Transcript.preprocessing_version == key["preprocessing_version"]
+        )
+        .order_by(Transcript.id.desc())
+        .limit(1)
+    ).scalar_one_or_none()
+
+
+def reusable_results(db: Session, content_hash: str) -> Dict:
+    """Trascrizione e verbale già prodotti per lo stesso contenuto, se presenti"""
+    transcript_id = latest_transcript_id(db, content_hash)
+    summary_id = None
+    if transcript_id:
+        summary_id = db.execute(
+            select(Verbs.id)
+            .where(Verbs.transcript_id == transcript_id)
+            .order_by(Verbs.id.desc())
+            .limit(1)
+        ).scalar_one_or_none()
+
+    return {"transcript_id": transcript_id, "summary_id": summary_id}
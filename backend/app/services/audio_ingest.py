@@ -0,0 +1,223 @@
+import json
+import subprocess
+from typing import Dict, Optional, Set
+from sqlalchemy.future import select
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.database import SessionLocal
+from app.models.audio_files import AudioFile
+from app.services.blob_store import blob_store
+from app.services.audio_storage import local_audio_file
+from app.services.audio_transcode import store_canonical, store_canonical_blob
+from app.services.waveform import ensure_peaks
+from app.services.audio_process_pool import audio_process_pool, AudioPoolSaturated
+
+# Contenuti con elaborazioni post-upload in corso in questo processo. Le elaborazioni girano
+# tutte sull'event loop dell'API, quindi il set non richiede lock; tra processi diversi il
+# calcolo dei picchi è protetto dal file di lock di ensure_peaks
+_post_ingest_in_progress: Set[str] = set()
+
+
+def _to_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def probe_audio_metadata(path: str) -> Dict:
+    """
+    Legge durata, codec, sample rate e canali con ffprobe (solo header, nessuna decodifica).
+    In caso di errore restituisce valori None: i metadati non devono bloccare l'upload.
+    """
+    metadata = {"duration_seconds": None, "codec": None, "sample_rate": None, "channels": None}
+
+    try:
+        result = subprocess.run(
+            [
+                "ffprobe", "-v", "error",
+                "-print_format", "json",
+                "-show_format", "-show_streams",
+                "-select_streams", "a:0",
+                path
+            ],
+            capture_output=True,
+            check=True,
+            timeout=60
+        )
+        info = json.loads(result.stdout)
+    except Exception as e:
+        print(f"⚠️ Impossibile leggere i metadati audio: {e}")
+        return metadata
+
+    streams = info.get("streams") or [{}]
+    stream = streams[0]
+    file_format = info.get("format", {})
+
+    metadata["duration_seconds"] = _to_float(stream.get("duration")) or _to_float(file_format.get("duration"))
+    metadata["codec"] = stream.get("codec_name")
+    metadata["sample_rate"] = _to_int(stream.get("sample_rate"))
+    metadata["channels"] = _to_int(stream.get("channels"))
+    return metadata
+
+
+def probe_stored_audio(storage_key: str) -> Dict:
+    """Metadati di un file presente nel blob store"""
+    with blob_store.local_file(storage_key) as path:
+        return probe_audio_metadata(path)
+
+
+def build_audio_record(file_name: str, stored: Dict) -> AudioFile:
+    """Crea (senza salvarlo) l'AudioFile per un file appena entrato nel blob store, con i metadati letti da ffprobe"""
+    metadata = probe_stored_audio(stored["storage_key"])
+    return AudioFile(
+        file_name=file_name,
+        storage_key=stored["storage_key"],
+        file_size=stored["file_size"],
+        content_hash=stored["content_hash"],
+        **metadata
+    )
+
+
+def find_canonical_key(db: Session, audio_file: AudioFile) -> Optional[str]:
+    """Chiave di una versione canonica già esistente per lo stesso contenuto, se presente nel blob store"""
+    if audio_file.canonical_key:
+        return audio_file.canonical_key
+
+    if not audio_file.content_hash:
+        return None
+
+    existing_key = db.execute(
+        select(AudioFile.canonical_key)
+        .where(AudioFile.content_hash == audio_file.content_hash, AudioFile.canonical_key.isnot(None))
+        .limit(1)
+    ).scalar_one_or_none()
+    return existing_key if existing_key and blob_store.exists(existing_key) else None
+
+
+def save_canonical_key(db: Session, audio_file: AudioFile, canonical_key: str, created: bool = False) -> str:
+    """
+    Collega la versione canonica a tutti i record con lo stesso contenuto che non ne hanno una.
+    Restituisce la chiave effettivamente salvata: se un'elaborazione concorrente ne ha registrata
+    un'altra prima, vale quella, e il blob appena creato (created=True) viene eliminato se nessun
+    record lo usa.
+    """
+    stmt = update(AudioFile).values(canonical_key=canonical_key)
+    if audio_file.content_hash:
+        stmt = stmt.where(AudioFile.content_hash == audio_file.content_hash, AudioFile.canonical_key.is_(None))
+    else:
+        stmt = stmt.where(AudioFile.id == audio_file.id)
+    db.execute(stmt)
+    db.commit()
+
+    stored_key = db.execute(
+        select(AudioFile.canonical_key).where(AudioFile.id == audio_file.id)
+    ).scalar_one_or_none() or canonical_key
+
+    if created and stored_key != canonical_key:
+        in_use = db.execute(
+            select(AudioFile.id)
+            .where((AudioFile.canonical_key == canonical_key) | (AudioFile.storage_key == canonical_key))
+            .limit(1)
+        ).scalar_one_or_none()
+        if not in_use:
+            blob_store.delete(canonical_key)
+            print(f"🧹 Versione canonica duplicata {canonical_key[:12]} eliminata")
+    return stored_key
+
+
+def ensure_canonical_audio(db: Session, audio_file: AudioFile) -> str:
+    """
+    Restituisce la chiave della versione canonica (Opus mono 16 kHz), creandola solo se
+    nessun record con lo stesso contenuto ne ha già una.
+    """
+    if audio_file.canonical_key:
+        return audio_file.canonical_key
+
+    canonical_key = find_canonical_key(db, audio_file)
+    created = canonical_key is None
+    if created:
+        with local_audio_file(audio_file) as source_path:
+            canonical_key = store_canonical(source_path)["storage_key"]
+        print(f"🎧 Versione canonica creata per l'audio {audio_file.id}")
+
+    return save_canonical_key(db, audio_file, canonical_key, created=created)
+
+
+def post_ingest_in_progress(content_hash: str) -> bool:
+    """True se le elaborazioni post-upload di questo contenuto sono già in corso"""
+    return content_hash in _post_ingest_in_progress
+
+
+def _get_audio_file(db: Session, audio_file_id: int) -> Optional[AudioFile]:
+    return db.execute(select(AudioFile).filter(AudioFile.id == audio_file_id)).scalar_one_or_none()
+
+
+async def _run_stages(db: Session, audio_file: AudioFile):
+    """Versione canonica e picchi di un AudioFile; gli errori di una fase non bloccano la successiva"""
+    audio_file_id = audio_file.id
+    canonical_key = audio_file.canonical_key
+    try:
+        if canonical_key is None:
+            canonical_key = await run_in_threadpool(find_canonical_key, db, audio_file)
+            created = canonical_key is None
+            if created:
+                stored = await audio_process_pool.run_async(store_canonical_blob, audio_file.storage_key)
+                canonical_key = stored["storage_key"]
+                print(f"🎧 Versione canonica creata per l'audio {audio_file_id}")
+            canonical_key = await run_in_threadpool(
+                save_canonical_key, db, audio_file, canonical_key, created
+            )
+    except AudioPoolSaturated:
+        await run_in_threadpool(db.rollback)
+        canonical_key = None
+        print(f"⚠️ Pool audio saturo: conversione canonica dell'audio {audio_file_id} rinviata")
+    except Exception as e:
+        await run_in_threadpool(db.rollback)
+        canonical_key = None
+        print(f"❌ Errore nella conversione canonica dell'audio {audio_file_id}: {e}")
+
+    try:
+        # La versione canonica è più leggera da decodificare; i picchi restano indicizzati per l'originale
+        await audio_process_pool.run_async(
+            ensure_peaks, canonical_key or audio_file.storage_key, audio_file.content_hash
+        )
+    except AudioPoolSaturated:
+        print(f"⚠️ Pool audio saturo: calcolo dei picchi per l'audio {audio_file_id} rinviato")
+    except Exception as e:
+        print(f"❌ Errore nel calcolo dei picchi per l'audio {audio_file_id}: {e}")
+
+
+async def run_post_ingest_stages(audio_file_id: int):
+    """
+    Elaborazioni eseguite in background una sola volta dopo l'upload.
+    Ogni fase salta il lavoro se il risultato esiste già per lo stesso contenuto.
+    Transcodifica e picchi girano nel pool di processi audio e vengono attesi sull'event loop:
+    nessun thread del threadpool resta occupato (solo le brevi query vanno nel threadpool).
+    Se il pool è saturo la fase viene saltata (canonico e picchi vengono ricreati quando servono).
+    """
+    db = SessionLocal()
+    try:
+        audio_file = await run_in_threadpool(_get_audio_file, db, audio_file_id)
+        if not audio_file or not audio_file.storage_key:
+            return
+
+        # Richieste ripetute (es. polling dei picchi) non avviano una seconda elaborazione
+        in_progress_key = audio_file.content_hash or audio_file.storage_key
+        if in_progress_key in _post_ingest_in_progress:
+            return
+        _post_ingest_in_progress.add(in_progress_key)
+        try:
+            await _run_stages(db, audio_file)
+        finally:
+            _post_ingest_in_progress.discard(in_progress_key)
+    finally:
+        db.close()
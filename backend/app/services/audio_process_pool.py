@@ -0,0 +1,117 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Dict, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Processi dedicati a transcodifica, clip e picchi: il lavoro CPU non occupa il threadpool delle richieste
+AUDIO_POOL_WORKERS = int(os.getenv("AUDIO_POOL_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+# Lavori accettati in attesa oltre a quelli in esecuzione; oltre questo limite le richieste vengono rifiutate
+AUDIO_POOL_MAX_QUEUE = int(os.getenv("AUDIO_POOL_MAX_QUEUE", "8"))
+AUDIO_POOL_TIMEOUT_SECONDS = float(os.getenv("AUDIO_POOL_TIMEOUT_SECONDS", "300"))
+
+
+class AudioPoolSaturated(Exception):
+    """Coda del pool audio piena: il chiamante deve riprovare più tardi"""
+
+
+class AudioProcessPool:
+    """
+    Pool di processi con coda limitata per il lavoro audio CPU-bound.
+    I lavori oltre max_workers + max_queue vengono rifiutati subito invece di accumularsi.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._job_seconds = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Creato al primo utilizzo; "spawn" evita di duplicare con fork i thread del server
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+                print(f"⚙️ Pool audio avviato: {self.max_workers} processi, coda massima {self.max_queue}")
+            return self._executor
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Accoda fn (funzione a livello di modulo) nel pool; solleva AudioPoolSaturated se la coda è piena"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise AudioPoolSaturated("Troppe elaborazioni audio in corso, riprovare più tardi")
+
+        with self._lock:
+            self._in_flight += 1
+        submitted_at = time.monotonic()
+
+        def _release(future: Future):
+            with self._lock:
+                self._in_flight -= 1
+                self._job_seconds += time.monotonic() - submitted_at
+                if future.cancelled() or future.exception() is not None:
+                    self._failed += 1
+                else:
+                    self._completed += 1
+            self._slots.release()
+
+        try:
+            future = self._get_executor().submit(fn, *args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+            raise
+
+        future.add_done_callback(_release)
+        return future
+
+    def run(self, fn: Callable, *args, **kwargs):
+        """Esegue fn nel pool e attende il risultato (al massimo AUDIO_POOL_TIMEOUT_SECONDS)"""
+        return self.submit(fn, *args, **kwargs).result(timeout=AUDIO_POOL_TIMEOUT_SECONDS)
+
+    async def run_async(self, fn: Callable, *args, **kwargs):
+        """Come run(), ma attende il risultato sull'event loop senza occupare un thread del threadpool"""
+        future = asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+        return await asyncio.wait_for(future, timeout=AUDIO_POOL_TIMEOUT_SECONDS)
+
+    def stats(self) -> Dict:
+        """Utilizzo del pool: lavori in esecuzione, in coda e contatori cumulativi"""
+        with self._lock:
+            running = min(self._in_flight, self.max_workers)
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": running,
+                "queued": self._in_flight - running,
+                "utilization": round(running / self.max_workers, 2),
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "job_seconds": round(self._job_seconds, 1)
+            }
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+# Istanza globale
+audio_process_pool = AudioProcessPool(AUDIO_POOL_WORKERS, AUDIO_POOL_MAX_QUEUE)
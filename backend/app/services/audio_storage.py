@@ -0,0 +1,199 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import AsyncIterator, Dict, Iterator
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+from app.services.blob_store import blob_store
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Cartella di appoggio per upload in corso e file temporanei (i file completati vanno nel blob store)
+AUDIO_STORAGE_DIR = os.getenv("AUDIO_STORAGE_DIR", os.path.join("storage", "audio"))
+# Dimensione dei blocchi letti/scritti durante l'ingest: la memoria occupata non dipende dalla dimensione del file
+UPLOAD_CHUNK_SIZE = int(os.getenv("AUDIO_UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+
+async def save_upload_stream(upload: UploadFile) -> Dict:
+    """
+    Scrive l'upload su disco a blocchi di UPLOAD_CHUNK_SIZE byte man mano che arriva,
+    calcolando dimensione e hash SHA-256 durante la copia.
+
+    Returns:
+        Dict con storage_key, file_size e content_hash
+    """
+    os.makedirs(AUDIO_STORAGE_DIR, exist_ok=True)
+
+    hasher = hashlib.sha256()
+    file_size = 0
+    fd, temp_path = tempfile.mkstemp(dir=AUDIO_STORAGE_DIR, suffix=".part")
+
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                file_size += len(chunk)
+                await run_in_threadpool(out.write, chunk)
+
+        return _move_into_storage(temp_path, hasher.hexdigest(), file_size)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def hash_local_file(source_path: str) -> Dict:
+    """Calcola hash SHA-256 e dimensione di un file locale leggendolo a blocchi"""
+    hasher = hashlib.sha256()
+    file_size = 0
+    with open(source_path, "rb") as f:
+        while True:
+            chunk = f.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            hasher.update(chunk)
+            file_size += len(chunk)
+
+    return {"content_hash": hasher.hexdigest(), "file_size": file_size}
+
+
+def store_local_file(source_path: str) -> Dict:
+    """Calcola hash e dimensione di un file locale e lo sposta nel blob store"""
+    info = hash_local_file(source_path)
+    return _move_into_storage(source_path, info["content_hash"], info["file_size"])
+
+
+def stored_blob_info(content_hash: str) -> Dict:
+    """Dati di un contenuto già presente nel blob store (stesso formato di store_local_file)"""
+    return {
+        "storage_key": content_hash,
+        "file_size": blob_store.size(content_hash),
+        "content_hash": content_hash
+    }
+
+
+def blob_exists(content_hash: str) -> bool:
+    return blob_store.exists(content_hash)
+
+
+def move_into_storage(source_path: str, content_hash: str, file_size: int) -> Dict:
+    """Sposta nel blob store un file di cui hash e dimensione sono già noti"""
+    return _move_into_storage(source_path, content_hash, file_size)
+
+
+def _move_into_storage(source_path: str, content_hash: str, file_size: int) -> Dict:
+    # La chiave è l'hash del contenuto: rename, nessuna seconda copia
+    blob_store.put_file(source_path, content_hash)
+    return {
+        "storage_key": content_hash,
+        "file_size": file_size,
+        "content_hash": content_hash
+    }
+
+
+# --- Upload riprendibili: i blocchi vengono accodati a un file parziale per upload ---
+
+def upload_part_path(upload_id: str) -> str:
+    """Percorso del file parziale di un upload riprendibile"""
+    return os.path.join(AUDIO_STORAGE_DIR, "uploads", f"{upload_id}.part")
+
+
+def _upload_staging_dir(upload_id: str) -> str:
+    return os.path.join(AUDIO_STORAGE_DIR, "uploads", f"{upload_id}.staging")
+
+
+async def stage_upload_chunk(upload_id: str, chunks: AsyncIterator[bytes]) -> str:
+    """
+    Scrive il body di una richiesta in un file di appoggio proprio della richiesta: due richieste
+    sullo stesso upload (es. una vecchia connessione non ancora chiusa e la ripresa del client)
+    non scrivono mai sullo stesso file. Se il client si disconnette il file resta con i byte ricevuti,
+    che vengono accodati come per una richiesta conclusa.
+
+    Returns:
+        Percorso del file di appoggio
+    """
+    staging_dir = _upload_staging_dir(upload_id)
+    os.makedirs(staging_dir, exist_ok=True)
+    fd, staging_path = tempfile.mkstemp(dir=staging_dir, suffix=".chunk")
+
+    with os.fdopen(fd, "wb") as out:
+        try:
+            async for chunk in chunks:
+                if chunk:
+                    await run_in_threadpool(out.write, chunk)
+        except ClientDisconnect:
+            pass
+    return staging_path
+
+
+def commit_upload_chunk(upload_id: str, offset: int, staging_path: str) -> int:
+    """
+    Accoda al file parziale, a partire da offset, il blocco scritto da stage_upload_chunk.
+    Eventuali byte oltre offset (scrittura interrotta prima del commit) vengono scartati.
+
+    Returns:
+        Nuovo offset (dimensione del file parziale)
+    """
+    path = upload_part_path(upload_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with open(path, "r+b" if os.path.exists(path) else "wb") as out, open(staging_path, "rb") as chunk_file:
+        out.truncate(offset)
+        out.seek(offset)
+        for block in iter(lambda: chunk_file.read(UPLOAD_CHUNK_SIZE), b""):
+            out.write(block)
+        return out.tell()
+
+
+def discard_staged_chunk(staging_path: str):
+    if os.path.exists(staging_path):
+        os.remove(staging_path)
+
+
+def discard_upload(upload_id: str):
+    """Elimina il file parziale di un upload annullato e i blocchi di appoggio rimasti"""
+    path = upload_part_path(upload_id)
+    if os.path.exists(path):
+        os.remove(path)
+    shutil.rmtree(_upload_staging_dir(upload_id), ignore_errors=True)
+
+
+def delete_stored_audio(storage_key: str):
+    """Elimina un file audio dal blob store, se presente"""
+    blob_store.delete(storage_key)
+
+
+def read_audio_bytes(audio_file) -> bytes:
+    """Restituisce il contenuto di un AudioFile, sia nel blob store sia nel vecchio campo file_data"""
+    if audio_file.storage_key:
+        with blob_store.open(audio_file.storage_key) as f:
+            return f.read()
+    return audio_file.file_data
+
+
+@contextmanager
+def local_audio_file(audio_file) -> Iterator[str]:
+    """
+    Fornisce un percorso locale leggibile per un AudioFile.
+    I record non ancora migrati (contenuto in file_data) vengono scritti in un file temporaneo
+    che viene eliminato all'uscita dal blocco, anche in caso di errore.
+    """
+    if audio_file.storage_key:
+        with blob_store.local_file(audio_file.storage_key) as path:
+            yield path
+        return
+
+    temp_file = tempfile.NamedTemporaryFile(delete=False)
+    try:
+        with temp_file:
+            temp_file.write(audio_file.file_data)
+        yield temp_file.name
+    finally:
+        os.remove(temp_file.name)
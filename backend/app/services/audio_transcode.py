@@ -0,0 +1,80 @@
+import os
+import subprocess
+import tempfile
+from typing import Dict, List, Optional, Tuple
+from app.services.audio_storage import AUDIO_STORAGE_DIR, store_local_file
+from app.services.blob_store import blob_store
+
+# Formato canonico usato per trascrizioni, clip e rielaborazioni: Opus mono 16 kHz (parlato)
+CANONICAL_SAMPLE_RATE = 16000
+CANONICAL_CHANNELS = 1
+CANONICAL_BITRATE = os.getenv("CANONICAL_AUDIO_BITRATE", "24k")
+CANONICAL_EXTENSION = "ogg"
+
+
+def transcode_to_canonical(
+    source_path: str,
+    output_path: str,
+    start: Optional[float] = None,
+    duration: Optional[float] = None,
+    keep: Optional[List[Tuple[float, float]]] = None
+):
+    """
+    Converte un file audio (o il solo intervallo da start per duration secondi) nel formato canonico;
+    ffmpeg lavora in streaming tra i due file, senza caricare l'audio in memoria.
+    keep, se indicato, elenca gli intervalli (relativi a start) da conservare: il resto viene tolto.
+    """
+    range_args = []
+    if start is not None:
+        # -ss prima di -i: seek sul file in input senza decodificare la parte precedente
+        range_args += ["-ss", f"{start:.3f}"]
+    if duration is not None:
+        # -t prima di -i: limita la lettura dell'input. Come opzione di output non basterebbe con
+        # aselect, che toglie le pause: l'uscita non raggiunge mai duration e ffmpeg decodificherebbe
+        # il file fino alla fine
+        range_args += ["-t", f"{duration:.3f}"]
+    range_args += ["-i", source_path]
+    if keep:
+        selection = "+".join(f"between(t,{keep_start:.3f},{keep_end:.3f})" for keep_start, keep_end in keep)
+        range_args += ["-af", f"aselect='{selection}',asetpts=N/SR/TB"]
+
+    subprocess.run(
+        [
+            "ffmpeg", "-v", "error", "-y",
+            *range_args,
+            "-vn",
+            "-ac", str(CANONICAL_CHANNELS),
+            "-ar", str(CANONICAL_SAMPLE_RATE),
+            "-c:a", "libopus",
+            "-b:a", CANONICAL_BITRATE,
+            "-application", "voip",
+            # Output deterministico (numero di serie Ogg fisso, nessuna versione nell'header): due
+            # transcodifiche dello stesso contenuto producono lo stesso blob
+            "-fflags", "+bitexact",
+            "-flags:a", "+bitexact",
+            output_path
+        ],
+        capture_output=True,
+        check=True
+    )
+
+
+def store_canonical(source_path: str) -> Dict:
+    """Transcodifica nel formato canonico e salva il risultato nel blob store"""
+    os.makedirs(AUDIO_STORAGE_DIR, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=AUDIO_STORAGE_DIR, suffix=f".{CANONICAL_EXTENSION}")
+    os.close(fd)
+
+    try:
+        transcode_to_canonical(source_path, temp_path)
+        return store_local_file(temp_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def store_canonical_blob(storage_key: str) -> Dict:
+    """store_canonical per un file del blob store (funzione di modulo, eseguibile nel pool di processi audio)"""
+    with blob_store.local_file(storage_key) as source_path:
+        return store_canonical(source_path)
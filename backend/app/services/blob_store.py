@@ -0,0 +1,132 @@
+import mmap
+import os
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BLOB_STORE_BACKEND = os.getenv("BLOB_STORE_BACKEND", "local")
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", os.path.join("storage", "blobs"))
+
+
+class BlobStore(ABC):
+    """Storage dei contenuti binari indirizzato per hash del contenuto (la chiave è lo SHA-256)"""
+
+    @abstractmethod
+    def put_file(self, source_path: str, key: str):
+        """Sposta un file locale nello store con la chiave indicata"""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """Indica se la chiave è presente nello store"""
+
+    @abstractmethod
+    def size(self, key: str) -> int:
+        """Dimensione in byte del contenuto"""
+
+    @abstractmethod
+    def open(self, key: str) -> BinaryIO:
+        """Apre il contenuto in lettura binaria"""
+
+    @abstractmethod
+    def read_range(self, key: str, start: int, length: int) -> bytes:
+        """Legge length byte a partire da start"""
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Elimina il contenuto, se presente"""
+
+    def iter_range(self, key: str, start: int, end: int, chunk_size: int) -> Iterator[bytes]:
+        """Legge i byte da start a end (inclusi) a blocchi di chunk_size, senza caricare il file"""
+        with self.open(key) as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    @contextmanager
+    def local_file(self, key: str) -> Iterator[str]:
+        """
+        Fornisce un percorso locale del contenuto (necessario per ffmpeg).
+        Implementazione generica: copia a blocchi in un file temporaneo, eliminato all'uscita dal blocco;
+        i backend con file già su disco restituiscono direttamente il loro percorso.
+        """
+        temp_file = tempfile.NamedTemporaryFile(delete=False)
+        try:
+            with temp_file, self.open(key) as source:
+                shutil.copyfileobj(source, temp_file)
+            yield temp_file.name
+        finally:
+            os.remove(temp_file.name)
+
+
+class LocalBlobStore(BlobStore):
+    """Backend su filesystem locale con percorsi suddivisi per prefisso dell'hash: ab/cd/abcd..."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def put_file(self, source_path: str, key: str):
+        destination = self.path(key)
+        if os.path.exists(destination):
+            # Contenuto già presente: stesso hash, stessi byte
+            os.remove(source_path)
+            return
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        shutil.move(source_path, destination)
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    def size(self, key: str) -> int:
+        return os.path.getsize(self.path(key))
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self.path(key), "rb")
+
+    @contextmanager
+    def mmap(self, key: str) -> Iterator[mmap.mmap]:
+        """Mappa il file in memoria in sola lettura: le letture non copiano l'intero file"""
+        with open(self.path(key), "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                yield mapped
+            finally:
+                mapped.close()
+
+    def read_range(self, key: str, start: int, length: int) -> bytes:
+        if length <= 0 or self.size(key) == 0:
+            return b""
+        with self.mmap(key) as mapped:
+            return mapped[start:start + length]
+
+    def delete(self, key: str):
+        path = self.path(key)
+        if os.path.exists(path):
+            os.remove(path)
+
+    @contextmanager
+    def local_file(self, key: str) -> Iterator[str]:
+        yield self.path(key)
+
+
+def get_blob_store() -> BlobStore:
+    """Crea lo store configurato tramite BLOB_STORE_BACKEND"""
+    if BLOB_STORE_BACKEND == "local":
+        return LocalBlobStore(BLOB_STORE_DIR)
+    raise ValueError(f"❌ Backend blob store non supportato: {BLOB_STORE_BACKEND}")
+
+
+# Istanza globale
+blob_store = get_blob_store()
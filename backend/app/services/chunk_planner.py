@@ -0,0 +1,109 @@
+import os
+from typing import List, Tuple
+import numpy as np
+from dotenv import load_dotenv
+from app.services.pcm_stream import iter_pcm_blocks
+
+load_dotenv()
+
+# Durata obiettivo e massima di ogni pezzo inviato a Whisper (limite API: 25 MB per richiesta)
+CHUNK_TARGET_SECONDS = float(os.getenv("TRANSCRIPTION_CHUNK_TARGET_SECONDS", "600"))
+CHUNK_MAX_SECONDS = float(os.getenv("TRANSCRIPTION_CHUNK_MAX_SECONDS", "900"))
+# Il taglio viene cercato in una finestra attorno alla durata obiettivo
+CHUNK_SEARCH_SECONDS = float(os.getenv("TRANSCRIPTION_CHUNK_SEARCH_SECONDS", "120"))
+MIN_SILENCE_MS = int(os.getenv("TRANSCRIPTION_MIN_SILENCE_MS", "500"))
+SILENCE_THRESH_DBFS = float(os.getenv("TRANSCRIPTION_SILENCE_THRESH_DBFS", "-40"))
+
+# Analisi del volume: PCM mono 16 kHz in frame da 10 ms, letto a blocchi dalla pipe di ffmpeg
+ANALYSIS_SAMPLE_RATE = 16000
+FRAME_MS = 10
+FRAME_SAMPLES = ANALYSIS_SAMPLE_RATE * FRAME_MS // 1000
+ANALYSIS_BLOCK_SAMPLES = FRAME_SAMPLES * 4096
+
+
+def _frame_dbfs(samples: np.ndarray) -> np.ndarray:
+    """Volume (dBFS) di ogni frame da FRAME_SAMPLES campioni; l'ultimo frame può essere parziale"""
+    count = -(-len(samples) // FRAME_SAMPLES)
+    padded = np.zeros(count * FRAME_SAMPLES, dtype=np.float32)
+    padded[:len(samples)] = samples
+    frames = padded.reshape(count, FRAME_SAMPLES)
+    lengths = np.full(count, FRAME_SAMPLES, dtype=np.float32)
+    lengths[-1] = len(samples) - (count - 1) * FRAME_SAMPLES
+    rms = np.sqrt((frames ** 2).sum(axis=1) / lengths)
+    with np.errstate(divide="ignore"):
+        return 20 * np.log10(rms / 32768)
+
+
+def analyze_silence(path: str) -> Tuple[np.ndarray, float]:
+    """
+    Decodifica il file in streaming e restituisce, per ogni frame da FRAME_MS,
+    se è sotto la soglia di silenzio (1 byte per frame: circa 1 MB per 3 ore di audio)
+    e la durata totale in secondi.
+    """
+    masks = []
+    total_samples = 0
+    for samples in iter_pcm_blocks(path, ANALYSIS_SAMPLE_RATE, ANALYSIS_BLOCK_SAMPLES):
+        masks.append(_frame_dbfs(samples) < SILENCE_THRESH_DBFS)
+        total_samples += len(samples)
+
+    silent = np.concatenate(masks) if masks else np.zeros(0, dtype=bool)
+    return silent, total_samples / ANALYSIS_SAMPLE_RATE
+
+
+def find_silences(
+    silent: np.ndarray,
+    start_frame: int,
+    end_frame: int,
+    min_silence_ms: int = MIN_SILENCE_MS
+) -> List[Tuple[int, int]]:
+    """Pause (frame iniziale, frame finale escluso) lunghe almeno min_silence_ms nella finestra indicata"""
+    window = silent[start_frame:end_frame].astype(np.int8)
+    edges = np.diff(np.concatenate(([0], window, [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    min_frames = max(1, min_silence_ms // FRAME_MS)
+    return [
+        (start_frame + int(start), start_frame + int(end))
+        for start, end in zip(starts, ends)
+        if end - start >= min_frames
+    ]
+
+
+def _best_cut(silent: np.ndarray, position: float, duration: float) -> float:
+    """Punto di taglio: centro della pausa più vicina a position + CHUNK_TARGET_SECONDS"""
+    target = position + CHUNK_TARGET_SECONDS
+    window_start = max(position + 1.0, target - CHUNK_SEARCH_SECONDS)
+    window_end = min(position + CHUNK_MAX_SECONDS, duration)
+
+    # Solo la finestra di ricerca viene analizzata, non l'intero file
+    silences = find_silences(silent, int(window_start * 1000 / FRAME_MS), int(window_end * 1000 / FRAME_MS))
+
+    if not silences:
+        return min(target, window_end)
+
+    midpoints = [(start + end) * FRAME_MS / 2000 for start, end in silences]
+    return min(midpoints, key=lambda midpoint: abs(midpoint - target))
+
+
+def plan_chunks_from_mask(silent: np.ndarray, duration: float) -> List[Tuple[float, float]]:
+    """Pezzi (inizio, fine) calcolati da una maschera di silenzio già disponibile"""
+    duration = round(duration or 0.0, 3)
+    # Nessun campione decodificato: un pezzo vuoto non va inviato a ffmpeg e a Whisper
+    if duration <= 0:
+        raise ValueError("Audio vuoto o non decodificabile")
+    cuts = [0.0]
+
+    while duration - cuts[-1] > CHUNK_MAX_SECONDS:
+        cuts.append(round(_best_cut(silent, cuts[-1], duration), 3))
+
+    cuts.append(duration)
+    return list(zip(cuts[:-1], cuts[1:]))
+
+
+def plan_chunks(path: str) -> List[Tuple[float, float]]:
+    """
+    Divide l'audio in pezzi (inizio, fine) in secondi, di durata non superiore a CHUNK_MAX_SECONDS,
+    tagliando nelle pause così da non spezzare le frasi. Il file non viene mai decodificato
+    interamente in memoria.
+    """
+    return plan_chunks_from_mask(*analyze_silence(path))
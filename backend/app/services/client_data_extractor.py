@@ -1,5 +1,4 @@
 # backend/app/services/client_data_extractor.py
-import google.generativeai as genai
 import os
 import base64
 import json
@@ -9,15 +8,67 @@ import io
 import PyPDF2
 import docx
 from dotenv import load_dotenv
+from app.services.ai_gateway import ai_gateway
+from app.utils.tokens import count_tokens, truncate_to_tokens, fit_texts_to_budget
 
 load_dotenv()
-GEMINI_API = os.getenv("GEMINI_API_KEY")
+# Budget in token di una richiesta di estrazione (prompt + testo dei documenti): i dati del cliente
+# stanno di norma nelle prime pagine, i documenti lunghi vengono troncati invece che divisi
+CLIENT_DATA_MAX_INPUT_TOKENS = int(os.getenv("CLIENT_DATA_MAX_INPUT_TOKENS", "30000"))
+
+CLIENT_DATA_PROMPT = """
+        Analizza il seguente testo estratto da documenti aziendali e estrai le informazioni del cliente.
+        
+        TESTO DA ANALIZZARE:
+        {text}
+        
+        Estrai le seguenti informazioni se presenti:
+        - ragione_sociale (nome completo dell'azienda)
+        - partita_iva (11 cifre)
+        - codice_fiscale (16 caratteri per persone fisiche o 11 per aziende)
+        - telefono
+        - email
+        - pec (email certificata)
+        - indirizzo (via, numero civico)
+        - citta
+        - cap (5 cifre)
+        - provincia (2 lettere)
+        - rappresentante_legale (nome e cognome)
+        - cf_rappresentante (codice fiscale del rappresentante)
+        - settore_attivita
+        - numero_dipendenti (solo numero)
+        
+        IMPORTANTE:
+        - Restituisci SOLO un JSON valido
+        - Se un campo non è presente, usa null
+        - Non aggiungere testo prima o dopo il JSON
+        - Verifica che partita_iva contenga solo numeri
+        - Verifica che cap contenga solo numeri
+        - Pulisci i dati da caratteri speciali non necessari
+        
+        Esempio formato risposta:
+        {{
+            "ragione_sociale": "AZIENDA ESEMPIO S.R.L.",
+            "partita_iva": "12345678901",
+            "codice_fiscale": "12345678901",
+            "telefono": "080-1234567",
+            "email": "info@esempio.it",
+            "pec": "esempio@pec.it",
+            "indirizzo": "Via Roma, 123",
+            "citta": "Bari",
+            "cap": "70100",
+            "provincia": "BA",
+            "rappresentante_legale": "Mario Rossi",
+            "cf_rappresentante": "RSSMRA80A01F205X",
+            "settore_attivita": "Servizi",
+            "numero_dipendenti": 25
+        }}
+        """
+
 
 class ClientDataExtractor:
-    def __init__(self):
-        genai.configure(api_key=GEMINI_API)
-        self.model = genai.GenerativeModel("gemini-1.5-flash")
-    
+    """Le chiamate a Gemini passano dal gateway: client condiviso, senza bloccare l'event loop"""
+
     async def extract_from_documents(self, files: List[Dict]) -> Dict:
         """
         Estrae dati cliente da una lista di documenti
@@ -33,7 +84,7 @@ class ClientDataExtractor:
                     file_info['filename']
                 )
                 if text:
-                    extracted_texts.append(f"=== {file_info['filename']} ===\n{text}\n")
+                    extracted_texts.append((file_info['filename'], text))
             except Exception as e:
                 print(f"Errore estrazione {file_info['filename']}: {e}")
                 continue
@@ -41,11 +92,26 @@ class ClientDataExtractor:
         if not extracted_texts:
             return {"error": "Nessun testo estratto dai documenti"}
         
+        # Budget del testo: ogni documento lungo viene troncato alla stessa quota, i brevi restano interi
+        # (margine di 20 token per l'intestazione di ogni documento)
+        text_budget = (
+            CLIENT_DATA_MAX_INPUT_TOKENS
+            - count_tokens(CLIENT_DATA_PROMPT.format(text=""))
+            - 20 * len(extracted_texts)
+        )
+        texts = [text for _, text in extracted_texts]
+        fitted = fit_texts_to_budget(texts, text_budget)
+        truncated = fitted != texts
+        if truncated:
+            print(f"✂️ Documenti troncati per rientrare in {CLIENT_DATA_MAX_INPUT_TOKENS} token")
+
         # Unisce tutti i testi estratti
-        combined_text = "\n".join(extracted_texts)
+        combined_text = "\n".join(
+            f"=== {filename} ===\n{text}\n" for (filename, _), text in zip(extracted_texts, fitted)
+        )
         
         # Estrae i dati usando Gemini
-        return await self._extract_client_data_with_ai(combined_text)
+        return await self._extract_client_data_with_ai(combined_text, truncated=truncated)
     
     async def _extract_text_from_file(self, content_bytes: bytes, content_type: str, filename: str) -> str:
         """Estrae testo da diversi tipi di file"""
@@ -87,7 +153,10 @@ class ClientDataExtractor:
             Restituisci il testo estratto in modo strutturato.
             """
             
-            response = self.model.generate_content([prompt, image])
+            # I token dell'immagine non si stimano: nel registro resta il conteggio del provider
+            response = await ai_gateway.run_async(ai_gateway.gemini_generate(
+                [prompt, image], "client_data_image", estimated_input_tokens=count_tokens(prompt)
+            ))
             return response.text
             
         except Exception as e:
@@ -124,60 +193,26 @@ class ClientDataExtractor:
             print(f"Errore estrazione DOCX: {e}")
             return ""
     
-    async def _extract_client_data_with_ai(self, text: str) -> Dict:
-        """Usa Gemini per estrarre dati strutturati dal testo"""
-        
-        prompt = f"""
-        Analizza il seguente testo estratto da documenti aziendali e estrai le informazioni del cliente.
-        
-        TESTO DA ANALIZZARE:
-        {text}
-        
-        Estrai le seguenti informazioni se presenti:
-        - ragione_sociale (nome completo dell'azienda)
-        - partita_iva (11 cifre)
-        - codice_fiscale (16 caratteri per persone fisiche o 11 per aziende)
-        - telefono
-        - email
-        - pec (email certificata)
-        - indirizzo (via, numero civico)
-        - citta
-        - cap (5 cifre)
-        - provincia (2 lettere)
-        - rappresentante_legale (nome e cognome)
-        - cf_rappresentante (codice fiscale del rappresentante)
-        - settore_attivita
-        - numero_dipendenti (solo numero)
-        
-        IMPORTANTE:
-        - Restituisci SOLO un JSON valido
-        - Se un campo non è presente, usa null
-        - Non aggiungere testo prima o dopo il JSON
-        - Verifica che partita_iva contenga solo numeri
-        - Verifica che cap contenga solo numeri
-        - Pulisci i dati da caratteri speciali non necessari
-        
-        Esempio formato risposta:
-        {{
-            "ragione_sociale": "AZIENDA ESEMPIO S.R.L.",
-            "partita_iva": "12345678901",
-            "codice_fiscale": "12345678901",
-            "telefono": "080-1234567",
-            "email": "info@esempio.it",
-            "pec": "esempio@pec.it",
-            "indirizzo": "Via Roma, 123",
-            "citta": "Bari",
-            "cap": "70100",
-            "provincia": "BA",
-            "rappresentante_legale": "Mario Rossi",
-            "cf_rappresentante": "RSSMRA80A01F205X",
-            "settore_attivita": "Servizi",
-            "numero_dipendenti": 25
-        }}
+    async def _extract_client_data_with_ai(self, text: str, truncated: bool = False) -> Dict:
+        """
+        Usa Gemini per estrarre dati strutturati dal testo.
+        truncated: il testo è già stato ridotto al budget (per la registrazione della chiamata)
         """
         
+        # Il testo viene troncato se la richiesta supera il budget (chiamata diretta con testo lungo)
+        text_budget = CLIENT_DATA_MAX_INPUT_TOKENS - count_tokens(CLIENT_DATA_PROMPT.format(text=""))
+        if count_tokens(text) > text_budget:
+            text = truncate_to_tokens(text, text_budget)
+            truncated = True
+        prompt = CLIENT_DATA_PROMPT.format(text=text)
+
         try:
-            response = self.model.generate_content(prompt)
+            response = await ai_gateway.run_async(ai_gateway.gemini_generate(
+                prompt, "client_data",
+                estimated_input_tokens=count_tokens(prompt),
+                strategy="truncated" if truncated else "single",
+                truncated=truncated
+            ))
             
             # Pulisce la risposta per ottenere solo il JSON
             response_text = response.text.strip()
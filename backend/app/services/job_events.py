@@ -0,0 +1,53 @@
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+import redis
+import redis.asyncio as aioredis
+from redis.asyncio.client import PubSub
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Eventi dei job pubblicati dai worker Celery e inoltrati ai client WebSocket dall'API (Redis pub/sub)
+REDIS_URL = os.getenv("REDIS_URL", "redis://127.0.0.1:6379/0")
+JOB_EVENTS_PREFIX = "jobs:events:"
+# Intervallo massimo senza messaggi prima di verificare che il client sia ancora connesso
+JOB_EVENTS_POLL_SECONDS = 15.0
+
+_publisher: Optional[redis.Redis] = None
+
+
+def job_channel(job_id: int) -> str:
+    return f"{JOB_EVENTS_PREFIX}{job_id}"
+
+
+def publish_job_event(job_id: int, event: Dict):
+    """Pubblica un evento del job; un errore di Redis non deve interrompere il job"""
+    global _publisher
+    try:
+        if _publisher is None:
+            _publisher = redis.Redis.from_url(REDIS_URL)
+        _publisher.publish(job_channel(job_id), json.dumps({"job_id": job_id, **event}))
+    except Exception as e:
+        print(f"⚠️ Impossibile pubblicare l'evento del job {job_id}: {e}")
+
+
+@asynccontextmanager
+async def job_event_subscription(job_id: int) -> AsyncIterator[PubSub]:
+    """Iscrizione agli eventi di un job, attiva per tutta la durata del blocco"""
+    client = aioredis.Redis.from_url(REDIS_URL)
+    pubsub = client.pubsub()
+    await pubsub.subscribe(job_channel(job_id))
+    try:
+        yield pubsub
+    finally:
+        await pubsub.unsubscribe(job_channel(job_id))
+        await pubsub.aclose()
+        await client.aclose()
+
+
+async def next_job_event(pubsub: PubSub) -> Optional[Dict]:
+    """Prossimo evento, oppure None dopo JOB_EVENTS_POLL_SECONDS senza messaggi"""
+    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=JOB_EVENTS_POLL_SECONDS)
+    return json.loads(message["data"]) if message else None
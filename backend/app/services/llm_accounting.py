@@ -0,0 +1,60 @@
+import os
+from typing import Any, Optional, Tuple
+from dotenv import load_dotenv
+from app.database import SessionLocal
+from app.models.llm_calls import LLMCall
+
+load_dotenv()
+
+# Le chiamate vengono registrate nella tabella llm_calls (token, durata, esito); disattivabile
+LLM_CALL_LOGGING_ENABLED = os.getenv("LLM_CALL_LOGGING_ENABLED", "true").lower() == "true"
+
+
+def usage_from_response(response: Any) -> Tuple[Optional[int], Optional[int]]:
+    """Token di input e di output conteggiati dal provider (usage_metadata di Gemini, usage di OpenAI), se presenti"""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        return getattr(usage, "prompt_token_count", None), getattr(usage, "candidates_token_count", None)
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        return getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None)
+    return None, None
+
+
+def record_llm_call(
+    provider: str,
+    model: str,
+    operation: str,
+    strategy: str,
+    estimated_input_tokens: int,
+    duration_seconds: float,
+    response: Any = None,
+    truncated: bool = False,
+    error: Optional[Exception] = None
+):
+    """Salva una riga in llm_calls; un errore di scrittura non interrompe la chiamata al modello"""
+    if not LLM_CALL_LOGGING_ENABLED:
+        return
+
+    input_tokens, output_tokens = usage_from_response(response)
+    db = SessionLocal()
+    try:
+        db.add(LLMCall(
+            provider=provider,
+            model=model,
+            operation=operation,
+            strategy=strategy,
+            estimated_input_tokens=estimated_input_tokens,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            truncated=truncated,
+            duration_ms=int(duration_seconds * 1000),
+            success=error is None,
+            error_message=str(error) if error else None
+        ))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"⚠️ Registrazione della chiamata {operation} non riuscita: {e}")
+    finally:
+        db.close()
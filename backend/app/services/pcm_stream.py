@@ -0,0 +1,47 @@
+import subprocess
+from typing import Iterator
+import numpy as np
+
+# Dimensione predefinita dei blocchi letti dalla pipe di ffmpeg (campioni int16 mono)
+PCM_BLOCK_SAMPLES = 256 * 1024
+
+
+def iter_pcm_blocks(path: str, sample_rate: int, block_samples: int = PCM_BLOCK_SAMPLES) -> Iterator[np.ndarray]:
+    """
+    Decodifica il file con ffmpeg in PCM mono int16 su pipe e lo restituisce a blocchi
+    di block_samples campioni: in memoria resta un solo blocco alla volta.
+    Se il consumatore si interrompe o si verifica un errore, il processo ffmpeg viene terminato.
+    """
+    process = subprocess.Popen(
+        [
+            "ffmpeg", "-v", "error",
+            "-i", path,
+            "-vn",
+            "-f", "s16le", "-ac", "1", "-ar", str(sample_rate),
+            "pipe:1"
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL
+    )
+
+    completed = False
+    try:
+        pending = b""
+        while True:
+            raw = process.stdout.read(block_samples * 2)
+            if not raw:
+                break
+            raw = pending + raw
+            usable = len(raw) // 2 * 2
+            pending = raw[usable:]
+            if usable:
+                yield np.frombuffer(raw[:usable], dtype=np.int16)
+        completed = True
+    finally:
+        if not completed:
+            process.kill()
+        process.stdout.close()
+        return_code = process.wait()
+
+    if return_code != 0:
+        raise RuntimeError(f"ffmpeg terminato con codice {return_code}")
@@ -0,0 +1,128 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+import redis
+from dotenv import load_dotenv
+from sqlalchemy.future import select
+from app.database import SessionLocal
+from app.models.prompts import Prompt
+
+load_dotenv()
+
+# Cache in memoria dei prompt, per processo. Una modifica (PUT /api/prompts/{id}) viene notificata
+# a tutti i processi (API e worker Celery) su un canale Redis; se un messaggio va perso, dopo
+# PROMPT_CACHE_TTL_SECONDS la versione in memoria viene comunque confrontata con quella a DB.
+REDIS_URL = os.getenv("REDIS_URL", "redis://127.0.0.1:6379/0")
+PROMPT_INVALIDATION_CHANNEL = "prompts:invalidate"
+PROMPT_CACHE_TTL_SECONDS = float(os.getenv("PROMPT_CACHE_TTL_SECONDS", "300"))
+# Attesa prima di riconnettersi a Redis dopo un errore
+PROMPT_LISTENER_RETRY_SECONDS = 5.0
+
+
+class PromptCache:
+    """Testo dei prompt per ID, con la versione letta dal DB e l'istante dell'ultima verifica"""
+
+    def __init__(self, ttl_seconds: float = PROMPT_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[int, Tuple[int, str, float]] = {}
+        self._lock = threading.Lock()
+        self._listener_pid: Optional[int] = None
+        self._publisher: Optional[redis.Redis] = None
+
+    def load_all(self):
+        """Carica tutti i prompt (all'avvio del processo)"""
+        self.start_listener()
+        db = SessionLocal()
+        try:
+            rows = db.execute(select(Prompt.id, Prompt.version, Prompt.prompt)).all()
+        finally:
+            db.close()
+        now = time.monotonic()
+        with self._lock:
+            self._entries = {row.id: (row.version, row.prompt, now) for row in rows}
+        print(f"✅ Cache dei prompt caricata: {len(rows)} prompt")
+
+    def get(self, prompt_id: int) -> Optional[str]:
+        """Testo del prompt; None se non esiste"""
+        self.start_listener()
+        with self._lock:
+            entry = self._entries.get(prompt_id)
+        if entry and time.monotonic() - entry[2] < self.ttl_seconds:
+            return entry[1]
+
+        db = SessionLocal()
+        try:
+            # Copia scaduta: si rilegge il testo solo se la versione è cambiata
+            if entry:
+                version = db.execute(select(Prompt.version).filter(Prompt.id == prompt_id)).scalar_one_or_none()
+                if version == entry[0]:
+                    with self._lock:
+                        self._entries[prompt_id] = (entry[0], entry[1], time.monotonic())
+                    return entry[1]
+
+            row = db.execute(
+                select(Prompt.version, Prompt.prompt).filter(Prompt.id == prompt_id)
+            ).first()
+        finally:
+            db.close()
+
+        with self._lock:
+            if row is None:
+                self._entries.pop(prompt_id, None)
+                return None
+            self._entries[prompt_id] = (row.version, row.prompt, time.monotonic())
+        return row.prompt
+
+    def invalidate(self, prompt_id: Optional[int] = None):
+        """Scarta un prompt (o tutti) dalla cache locale"""
+        with self._lock:
+            if prompt_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(prompt_id, None)
+
+    def publish_invalidation(self, prompt_id: int, version: int):
+        """Invalida la copia locale e notifica gli altri processi; un errore di Redis non blocca la modifica"""
+        self.invalidate(prompt_id)
+        try:
+            if self._publisher is None:
+                self._publisher = redis.Redis.from_url(REDIS_URL)
+            self._publisher.publish(PROMPT_INVALIDATION_CHANNEL, json.dumps({"prompt_id": prompt_id, "version": version}))
+        except Exception as e:
+            print(f"⚠️ Impossibile notificare la modifica del prompt {prompt_id}: {e}")
+
+    def start_listener(self):
+        """Avvia il thread in ascolto delle invalidazioni (una volta per processo, anche dopo un fork)"""
+        with self._lock:
+            if self._listener_pid == os.getpid():
+                return
+            self._listener_pid = os.getpid()
+            # Dopo un fork la connessione del processo padre non va riusata
+            self._publisher = None
+        threading.Thread(target=self._listen, name="prompt-cache-listener", daemon=True).start()
+
+    def _listen(self):
+        connected_before = False
+        while True:
+            try:
+                client = redis.Redis.from_url(REDIS_URL)
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(PROMPT_INVALIDATION_CHANNEL)
+                # Riconnessione: le notifiche arrivate nel frattempo sono perse, si svuota la cache
+                if connected_before:
+                    self.invalidate()
+                connected_before = True
+
+                for message in pubsub.listen():
+                    data = json.loads(message["data"])
+                    self.invalidate(data["prompt_id"])
+                    print(f"♻️ Prompt {data['prompt_id']} aggiornato alla versione {data['version']}")
+            except Exception as e:
+                print(f"⚠️ Ascolto delle modifiche ai prompt interrotto: {e}")
+                time.sleep(PROMPT_LISTENER_RETRY_SECONDS)
+
+
+# Istanza globale
+prompt_cache = PromptCache()
@@ -1,50 +1,161 @@
-import google.generativeai as genai
-from sqlalchemy.orm import Session
-from app.models.prompts import Prompt
-from app.database import SessionLocal  # dipende dal tuo setup, assicurati che sia la sessione corretta
+import asyncio
+import html
+from concurrent.futures import as_completed
+from typing import Callable, List, Optional
+from app.services.async_runner import submit
+from app.services.prompt_cache import prompt_cache
+from app.services.ai_gateway import ai_gateway
+from app.utils.tokens import count_tokens, split_into_windows, fit_texts_to_budget
 import os
 import re
 from dotenv import load_dotenv
 
 load_dotenv()
-GEMINI_API=os.getenv("GEMINI_API_KEY")
+# Prompt del verbale nella tabella prompts
+SUMMARY_PROMPT_ID = 1
 
-def generate_summary(transcript_text: str) -> str:
-    genai.configure(api_key=GEMINI_API)
+# Budget in token delle richieste (prompt + trascrizione). Oltre SUMMARY_SINGLE_PASS_MAX_TOKENS
+# la trascrizione viene riassunta in modalità map-reduce: note estratte in parallelo da richieste
+# di al massimo SUMMARY_WINDOW_TOKENS, poi un passaggio finale entro SUMMARY_MAX_INPUT_TOKENS
+SUMMARY_SINGLE_PASS_MAX_TOKENS = int(os.getenv("SUMMARY_SINGLE_PASS_MAX_TOKENS", "30000"))
+SUMMARY_WINDOW_TOKENS = int(os.getenv("SUMMARY_WINDOW_TOKENS", "8000"))
+SUMMARY_MAX_INPUT_TOKENS = max(int(os.getenv("SUMMARY_MAX_INPUT_TOKENS", "60000")), SUMMARY_SINGLE_PASS_MAX_TOKENS)
+SUMMARY_MAP_CONCURRENCY = int(os.getenv("SUMMARY_MAP_CONCURRENCY", "6"))
 
-    def clean_html(raw_html: str) -> str:
-        return re.sub(r"<[^>]+>", "", raw_html).strip()
+# Prompt della fase map: note per le sezioni del verbale lette da estrai_sezioni_verbale
+MAP_PROMPT = """Stai preparando il verbale di una riunione dell'Organismo di Vigilanza (OdV).
+Ricevi la parte {index} di {total} della trascrizione della riunione.
+Estrai in modo fedele, come elenco puntato, tutte le informazioni utili al verbale raggruppate in:
+- Oggetto della riunione
+- Processo interessato dal controllo dell'OdV
+- Documenti esaminati
+- Premessa
+- Argomenti trattati (con decisioni, richieste, scadenze e responsabili)
+- Considerazioni
+- Conclusioni
+Ometti i gruppi senza informazioni e non aggiungere nulla che non sia nella trascrizione."""
 
-    # Connessione al DB per recuperare il prompt
-    db: Session = SessionLocal()
+# Premessa al prompt del verbale quando la trascrizione è sostituita dalle note della fase map
+REDUCE_PREAMBLE = (
+    "La riunione è lunga: al posto della trascrizione integrale ricevi le note estratte, in ordine "
+    "cronologico, da {total} parti consecutive. Usale come trascrizione per compilare il verbale."
+)
+
+ProgressCallback = Callable[[int, str], None]
+
+
+def transcript_paragraphs(raw_html: str) -> List[str]:
+    """Paragrafi di testo della trascrizione HTML (un <p> per paragrafo, come salvata dall'editor)"""
+    text = re.sub(r"</p>|<br\s*/?>", "\n", raw_html)
+    text = html.unescape(re.sub(r"<[^>]+>", "", text))
+    return [line.strip() for line in text.split("\n") if line.strip()]
+
+
+def _load_prompt_template() -> str:
+    # Letto dalla cache in memoria, aggiornata quando il prompt viene modificato
+    prompt_template = prompt_cache.get(SUMMARY_PROMPT_ID)
+    if prompt_template is None:
+        raise ValueError("⚠️ Prompt non trovato nel database.")
+    return prompt_template
+
+
+def _build_prompt(prompt_template: str, transcript: str) -> str:
+    return (
+        prompt_template.strip()
+        + "\n\n<TRASCRIZIONE>\n"
+        + transcript.strip()
+        + "\n</TRASCRIZIONE>"
+    )
+
+
+def _map_prompt(window: str, index: int, total: int) -> str:
+    return MAP_PROMPT.format(index=index + 1, total=total) + "\n\n<TRASCRIZIONE>\n" + window + "\n</TRASCRIZIONE>"
+
+
+async def _extract_window_notes(semaphore: asyncio.Semaphore, window: str, index: int, total: int) -> str:
+    prompt = _map_prompt(window, index, total)
+    async with semaphore:
+        response = await ai_gateway.gemini_generate(
+            prompt, "summary_map", estimated_input_tokens=count_tokens(prompt), strategy="map_reduce"
+        )
+    return response.text
+
+
+def _map_windows(windows: List[str], on_progress: Optional[ProgressCallback]) -> List[str]:
+    """Estrae le note di ogni finestra in parallelo; l'avanzamento va dal 10% all'85%"""
+    semaphore = asyncio.Semaphore(SUMMARY_MAP_CONCURRENCY)
+    futures = {
+        submit(_extract_window_notes(semaphore, window, index, len(windows))): index
+        for index, window in enumerate(windows)
+    }
+    notes = [None] * len(windows)
     try:
-        prompt_row = db.query(Prompt).filter(Prompt.id == 1).first()
-        if not prompt_row:
-            raise ValueError("⚠️ Prompt non trovato nel database.")
+        for done, future in enumerate(as_completed(futures), start=1):
+            notes[futures[future]] = future.result()
+            if on_progress:
+                on_progress(10 + 75 * done // len(windows), f"Analisi delle parti della riunione ({done}/{len(windows)})")
+    finally:
+        # Errore o annullamento: le chiamate non ancora partite non servono più
+        for future in futures:
+            future.cancel()
+    return notes
 
-        prompt_template = prompt_row.prompt
-        transcript_clean = clean_html(transcript_text)
 
+def generate_summary(transcript_text: str, on_progress: Optional[ProgressCallback] = None) -> str:
+    """
+    Genera il verbale dalla trascrizione HTML. La dimensione in token viene misurata prima dell'invio:
+    le trascrizioni oltre SUMMARY_SINGLE_PASS_MAX_TOKENS vengono divise lungo i paragrafi in finestre
+    elaborate in parallelo (map) e il verbale viene composto dalle note ottenute (reduce).
+    on_progress(percentuale, messaggio): se solleva un'eccezione la generazione si interrompe.
+    """
+    prompt_template = _load_prompt_template()
+    paragraphs = transcript_paragraphs(transcript_text)
+    transcript_clean = "\n".join(paragraphs)
+    template_tokens = count_tokens(prompt_template)
+    truncated = False
+
+    if template_tokens + count_tokens(transcript_clean) <= SUMMARY_SINGLE_PASS_MAX_TOKENS:
+        strategy, operation = "single", "summary"
+        prompt = _build_prompt(prompt_template, transcript_clean)
+    else:
+        strategy, operation = "map_reduce", "summary_reduce"
+        # Spazio per la trascrizione in ogni richiesta map, tolto il prompt (stimato sul caso peggiore)
+        window_budget = SUMMARY_WINDOW_TOKENS - count_tokens(_map_prompt("", 999, 999))
+        windows = split_into_windows(paragraphs, window_budget)
+        print(f"🧩 Trascrizione lunga: verbale in modalità map-reduce su {len(windows)} parti")
+        notes = _map_windows(windows, on_progress)
+        if on_progress:
+            on_progress(85, "Composizione del verbale")
+
+        # Le note che superano il budget del passaggio finale vengono troncate in modo uniforme
+        # (margine di 20 token per l'intestazione "### Parte N" di ogni nota e per i tag)
+        preamble = REDUCE_PREAMBLE.format(total=len(windows))
+        notes_budget = SUMMARY_MAX_INPUT_TOKENS - template_tokens - count_tokens(preamble) - 20 * (len(notes) + 1)
+        if notes_budget <= 0:
+            raise ValueError("⚠️ Prompt del verbale troppo lungo per SUMMARY_MAX_INPUT_TOKENS")
+        fitted = fit_texts_to_budget([text.strip() for text in notes], notes_budget)
+        truncated = fitted != [text.strip() for text in notes]
+        if truncated:
+            print(f"✂️ Note troncate per rientrare in {SUMMARY_MAX_INPUT_TOKENS} token")
+
+        notes_text = "\n\n".join(f"### Parte {index + 1}\n{text}" for index, text in enumerate(fitted))
         prompt = (
             prompt_template.strip()
-            + "\n\n<TRASCRIZIONE>\n"
-            + transcript_clean.strip()
-            + "\n</TRASCRIZIONE>"
+            + "\n\n" + preamble
+            + "\n\n<TRASCRIZIONE>\n" + notes_text + "\n</TRASCRIZIONE>"
         )
-        #prompt = prompt_template.replace("{{TRASCRIZIONE}}", transcript_text)
+    #prompt = prompt_template.replace("{{TRASCRIZIONE}}", transcript_text)
 
-        # Generazione contenuto con Gemini
-        model = genai.GenerativeModel("gemini-1.5-flash")
-        response = model.generate_content(prompt)
+    # Generazione contenuto con Gemini (client condiviso del gateway)
+    response = ai_gateway.run(ai_gateway.gemini_generate(
+        prompt, operation, estimated_input_tokens=count_tokens(prompt), strategy=strategy, truncated=truncated
+    ))
 
-        print("\n--- PROMPT ---\n")
-        print(prompt)
-        print("\n--- FINE PROMPT ---\n")
+    print("\n--- PROMPT ---\n")
+    print(prompt)
+    print("\n--- FINE PROMPT ---\n")
 
-        print("\n--- RISPOSTA ---\n")
-        print(response.text)
-        print("\n--- FINE RISPOSTA ---\n")
-        return response.text
-
-    finally:
-        db.close()
+    print("\n--- RISPOSTA ---\n")
+    print(response.text)
+    print("\n--- FINE RISPOSTA ---\n")
+    return response.text
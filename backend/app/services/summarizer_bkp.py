@@ -1,10 +1,9 @@
-from openai import OpenAI
-import os
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from app.services.ai_gateway import ai_gateway
 
 def generate_summary(transcript_text: str) -> str:
-    response = client.chat.completions.create(
+    # Client OpenAI condiviso del gateway
+    response = ai_gateway.chat_completion(
+        "summary_bkp",
         model="gpt-4-turbo",
         messages = [
             {
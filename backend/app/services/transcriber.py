@@ -1,32 +1,183 @@
+import asyncio
+import hashlib
 import os
+import random
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Optional
 import openai
 from dotenv import load_dotenv
+from app.services.ai_gateway import ai_gateway
+from app.services.async_runner import run_sync
+from app.services.audio_ingest import probe_audio_metadata
 
 load_dotenv()
-openai.api_key = os.getenv("OPENAI_API_KEY")
 
-def transcribe_audio(filepath: str):
-    if not openai.api_key:
-        return {"error": "❌ OPENAI_API_KEY mancante. Aggiungila nel file .env."}
+# Motore di trascrizione: "openai" (Whisper) oppure "fake" (locale, deterministico, per benchmark offline)
+TRANSCRIPTION_ENGINE = os.getenv("TRANSCRIPTION_ENGINE", "openai")
+# Modello e lingua di trascrizione (fanno parte della chiave della cache delle trascrizioni)
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "whisper-1")
+TRANSCRIPTION_LANGUAGE = os.getenv("TRANSCRIPTION_LANGUAGE", "it")
+# Motore fake: secondi di audio "trascritti" per secondo di attesa e durata di ogni segmento generato
+FAKE_TRANSCRIPTION_SPEED = float(os.getenv("FAKE_TRANSCRIPTION_SPEED", "50"))
+FAKE_SEGMENT_SECONDS = float(os.getenv("FAKE_SEGMENT_SECONDS", "5"))
 
-    try:
-        with open(filepath, "rb") as audio_file:
-            transcription = openai.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file,
-                response_format="verbose_json",
-                language="it"
-            )
+# Retry di Whisper su 429/5xx (concorrenza e timeout sono quelli del provider OpenAI nel gateway)
+WHISPER_MAX_RETRIES = int(os.getenv("WHISPER_MAX_RETRIES", "4"))
+WHISPER_RETRY_BASE_SECONDS = float(os.getenv("WHISPER_RETRY_BASE_SECONDS", "1"))
+WHISPER_RETRY_MAX_SECONDS = 30.0
 
-            print(f"transcription response ---> {transcription}")
+FAKE_WORDS = [
+    "modello", "organizzativo", "verifica", "procedura", "controllo", "rischio",
+    "responsabile", "documento", "audit", "segnalazione", "formazione", "reato"
+]
+
+
+class TranscriptionEngine(ABC):
+    """Motore di trascrizione di un file audio in testo e segmenti con timestamp"""
+
+    name: str
+    model: str
+    language: str = TRANSCRIPTION_LANGUAGE
+
+    @abstractmethod
+    async def transcribe_async(self, filepath: str, upload_name: Optional[str] = None) -> Dict:
+        """
+        Trascrive il file e restituisce {"language", "segments", "transcription"}.
+        I segmenti hanno almeno id, start, end e text. Solleva un'eccezione in caso di errore.
+        """
+
+    def transcribe(self, filepath: str, upload_name: Optional[str] = None) -> Dict:
+        """Versione sincrona: la chiamata gira sul loop condiviso del processo"""
+        return run_sync(self.transcribe_async(filepath, upload_name=upload_name))
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Errori temporanei: rate limit, errori del server, timeout e connessioni interrotte"""
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return isinstance(error, (openai.APIConnectionError, asyncio.TimeoutError))
+
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    """Backoff esponenziale con jitter; se il server indica Retry-After si rispetta quello"""
+    if isinstance(error, openai.APIStatusError):
+        retry_after = error.response.headers.get("retry-after")
+        try:
+            return min(float(retry_after), WHISPER_RETRY_MAX_SECONDS)
+        except (TypeError, ValueError):
+            pass
+    delay = min(WHISPER_RETRY_BASE_SECONDS * 2 ** attempt, WHISPER_RETRY_MAX_SECONDS)
+    return random.uniform(delay / 2, delay)
+
+
+class OpenAITranscriptionEngine(TranscriptionEngine):
+    """
+    Whisper tramite API OpenAI, con il client condiviso del gateway AI (connessioni keep-alive
+    riutilizzate tra le chiamate, limite di richieste contemporanee e timeout del provider).
+    """
+
+    name = "openai"
+
+    def __init__(self, model: str = WHISPER_MODEL):
+        self.model = model
+
+    async def transcribe_async(self, filepath: str, upload_name: Optional[str] = None) -> Dict:
+        # Il file (un pezzo di pochi MB) viene letto una volta sola, anche in caso di retry
+        audio_bytes = await asyncio.to_thread(Path(filepath).read_bytes)
+        file_name = upload_name or os.path.basename(filepath)
+
+        attempt = 0
+        while True:
+            try:
+                transcription = await ai_gateway.openai_call(
+                    "transcription", self.model,
+                    lambda client: client.audio.transcriptions.create(
+                        model=self.model,
+                        file=(file_name, audio_bytes),
+                        response_format="verbose_json",
+                        language=self.language
+                    )
+                )
+                break
+            except Exception as e:
+                if attempt >= WHISPER_MAX_RETRIES or not _is_retryable(e):
+                    raise
+                delay = _retry_delay(e, attempt)
+                attempt += 1
+                print(f"⚠️ Whisper non disponibile ({e}), tentativo {attempt}/{WHISPER_MAX_RETRIES} tra {delay:.1f}s")
+                await asyncio.sleep(delay)
 
-        full_text = transcription.text
-        segments = [s.dict() for s in transcription.segments]
         return {
-            "language": "it",
+            "language": self.language,
+            "segments": [s.model_dump() for s in transcription.segments],
+            "transcription": transcription.text
+        }
+
+
+class FakeTranscriptionEngine(TranscriptionEngine):
+    """
+    Motore locale senza rete: genera un segmento ogni FAKE_SEGMENT_SECONDS con testo derivato
+    dal contenuto del file (stesso file, stesso risultato) e simula la latenza impiegando
+    durata / speed secondi. Serve per benchmark e test di carico della pipeline.
+    """
+
+    name = "fake"
+
+    def __init__(self, speed: float = FAKE_TRANSCRIPTION_SPEED, segment_seconds: float = FAKE_SEGMENT_SECONDS):
+        self.speed = speed
+        self.segment_seconds = segment_seconds
+        self.model = f"fake-{segment_seconds:g}s"
+
+    def _seed(self, filepath: str) -> bytes:
+        digest = hashlib.sha256()
+        with open(filepath, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.digest()
+
+    def _fake_result(self, filepath: str) -> Dict:
+        duration = probe_audio_metadata(filepath)["duration_seconds"]
+        if duration is None:
+            raise RuntimeError("Durata del file non disponibile")
+
+        seed = self._seed(filepath)
+        segments = []
+        start = 0.0
+        while start < duration:
+            end = min(start + self.segment_seconds, duration)
+            index = len(segments)
+            words = [FAKE_WORDS[seed[(index + k) % len(seed)] % len(FAKE_WORDS)] for k in range(6)]
+            segments.append({
+                "id": index,
+                "start": round(start, 3),
+                "end": round(end, 3),
+                "text": f" {' '.join(words).capitalize()}."
+            })
+            start = end
+
+        return {
+            "language": self.language,
             "segments": segments,
-            "transcription": full_text
+            "transcription": "".join(segment["text"] for segment in segments).strip(),
+            "duration": duration
         }
 
-    except Exception as e:
-        return {"error": f"❌ Errore durante la trascrizione: {str(e)}"}
+    async def transcribe_async(self, filepath: str, upload_name: Optional[str] = None) -> Dict:
+        result = await asyncio.to_thread(self._fake_result, filepath)
+        if self.speed > 0:
+            await asyncio.sleep(result["duration"] / self.speed)
+        return result
+
+
+def get_transcription_engine() -> TranscriptionEngine:
+    """Crea il motore configurato tramite TRANSCRIPTION_ENGINE"""
+    if TRANSCRIPTION_ENGINE == "openai":
+        return OpenAITranscriptionEngine()
+    if TRANSCRIPTION_ENGINE == "fake":
+        return FakeTranscriptionEngine()
+    raise ValueError(f"❌ Motore di trascrizione non supportato: {TRANSCRIPTION_ENGINE}")
+
+
+# Istanza globale
+transcription_engine = get_transcription_engine()
@@ -0,0 +1,139 @@
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import delete, func
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from app.models.transcription_cache import TranscriptionCache
+from app.services.audio_transcode import CANONICAL_BITRATE
+from app.services.transcriber import transcription_engine
+from app.services.vad import VAD_ENABLED, VAD_MIN_SILENCE_MS, VAD_PADDING_MS
+
+load_dotenv()
+
+# Eviction: voci più vecchie di MAX_AGE_DAYS e, oltre MAX_BYTES totali, le meno usate di recente
+TRANSCRIPTION_CACHE_MAX_AGE_DAYS = int(os.getenv("TRANSCRIPTION_CACHE_MAX_AGE_DAYS", "90"))
+TRANSCRIPTION_CACHE_MAX_BYTES = int(os.getenv("TRANSCRIPTION_CACHE_MAX_BYTES", str(500 * 1024 * 1024)))
+EVICTION_BATCH_SIZE = 200
+
+# Da incrementare quando cambia il modo in cui l'audio viene preparato per Whisper
+PREPROCESSING_REVISION = 1
+
+
+def preprocessing_version() -> str:
+    """Versione della pre-elaborazione corrente: formato canonico e impostazioni del VAD"""
+    version = f"{PREPROCESSING_REVISION}-opus{CANONICAL_BITRATE}"
+    if VAD_ENABLED:
+        version += f"-vad{VAD_MIN_SILENCE_MS}-{VAD_PADDING_MS}"
+    return version
+
+
+def transcription_key() -> Dict[str, str]:
+    """Modello, lingua e pre-elaborazione correnti: insieme all'hash identificano un risultato riusabile"""
+    return {
+        "model": transcription_engine.model,
+        "language": transcription_engine.language,
+        "preprocessing_version": preprocessing_version()
+    }
+
+
+def _key_filter(content_hash: str):
+    key = transcription_key()
+    return (
+        TranscriptionCache.content_hash == content_hash,
+        TranscriptionCache.model == key["model"],
+        TranscriptionCache.language == key["language"],
+        TranscriptionCache.preprocessing_version == key["preprocessing_version"]
+    )
+
+
+def get_cached_transcription(db: Session, content_hash: str) -> Optional[TranscriptionCache]:
+    """Risultato in cache per questo contenuto con modello, lingua e pre-elaborazione correnti"""
+    if not content_hash:
+        return None
+
+    entry = db.execute(select(TranscriptionCache).where(*_key_filter(content_hash))).scalar_one_or_none()
+    if not entry:
+        return None
+
+    max_age = timedelta(days=TRANSCRIPTION_CACHE_MAX_AGE_DAYS)
+    if entry.created_at and datetime.utcnow() - entry.created_at > max_age:
+        return None
+
+    entry.hit_count = (entry.hit_count or 0) + 1
+    entry.last_used_at = datetime.utcnow()
+    db.commit()
+    return entry
+
+
+def store_transcription(db: Session, content_hash: str, transcript_text: str, segments: List[Dict]):
+    """Salva (o sostituisce, in caso di aggiornamento forzato) il risultato in cache, poi applica l'eviction"""
+    if not content_hash or not transcript_text:
+        return
+
+    size_bytes = len(transcript_text.encode("utf-8")) + len(json.dumps(segments or []).encode("utf-8"))
+    now = datetime.utcnow()
+
+    entry = db.execute(select(TranscriptionCache).where(*_key_filter(content_hash))).scalar_one_or_none()
+    if entry:
+        entry.transcript_text = transcript_text
+        entry.segments = segments
+        entry.size_bytes = size_bytes
+        entry.created_at = now
+        entry.last_used_at = now
+    else:
+        db.add(TranscriptionCache(
+            content_hash=content_hash,
+            **transcription_key(),
+            transcript_text=transcript_text,
+            segments=segments,
+            size_bytes=size_bytes,
+            hit_count=0,
+            created_at=now,
+            last_used_at=now
+        ))
+    db.commit()
+
+    evict_transcription_cache(db)
+
+
+def evict_transcription_cache(db: Session) -> int:
+    """
+    Elimina le voci più vecchie di TRANSCRIPTION_CACHE_MAX_AGE_DAYS, poi le meno usate di recente
+    finché la dimensione totale non rientra in TRANSCRIPTION_CACHE_MAX_BYTES.
+
+    Returns:
+        Numero di voci eliminate
+    """
+    cutoff = datetime.utcnow() - timedelta(days=TRANSCRIPTION_CACHE_MAX_AGE_DAYS)
+    removed = db.execute(delete(TranscriptionCache).where(TranscriptionCache.created_at < cutoff)).rowcount or 0
+    db.commit()
+
+    total = db.execute(select(func.coalesce(func.sum(TranscriptionCache.size_bytes), 0))).scalar_one()
+    excess = total - TRANSCRIPTION_CACHE_MAX_BYTES
+
+    while excess > 0:
+        batch = db.execute(
+            select(TranscriptionCache.id, TranscriptionCache.size_bytes)
+            .order_by(TranscriptionCache.last_used_at, TranscriptionCache.id)
+            .limit(EVICTION_BATCH_SIZE)
+        ).all()
+        if not batch:
+            break
+
+        ids = []
+        for row in batch:
+            ids.append(row.id)
+            excess -= row.size_bytes
+            if excess <= 0:
+                break
+
+        db.execute(delete(TranscriptionCache).where(TranscriptionCache.id.in_(ids)))
+        db.commit()
+        removed += len(ids)
+
+    if removed:
+        print(f"🧹 Cache trascrizioni: {removed} voci eliminate")
+    return removed
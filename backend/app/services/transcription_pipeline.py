@@ -0,0 +1,281 @@
+import asyncio
+import os
+import tempfile
+from concurrent.futures import as_completed
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from sqlalchemy.orm import Session
+from sqlalchemy.future import select
+from sqlalchemy.exc import IntegrityError
+from dotenv import load_dotenv
+from app.models.audio_files import AudioFile
+from app.models.transcripts import Transcript
+from app.models.transcription_chunks import TranscriptionChunk
+from app.services.audio_ingest import ensure_canonical_audio
+from app.services.audio_transcode import CANONICAL_EXTENSION, transcode_to_canonical
+from app.services.blob_store import blob_store
+from app.services.chunk_planner import analyze_silence, plan_chunks_from_mask
+from app.services.async_runner import submit
+from app.services.transcriber import transcription_engine
+from app.services.vad import VAD_ENABLED, speech_intervals, restore_segments
+from app.services.transcription_cache import get_cached_transcription, store_transcription, transcription_key
+from app.utils.post_processing import format_transcription
+from app.utils.segments import pack_segments, concat_packed, split_diagnostics, to_packed
+
+load_dotenv()
+
+# Numero massimo di pezzi dello stesso audio in lavorazione contemporaneamente
+# (il limite di richieste OpenAI per processo è OPENAI_MAX_CONCURRENCY del gateway AI)
+TRANSCRIPTION_PARALLELISM = int(os.getenv("TRANSCRIPTION_PARALLELISM", "8"))
+# Conserva avg_logprob, compression_ratio, no_speech_prob e temperature (colonna segment_diagnostics)
+TRANSCRIPTION_KEEP_DIAGNOSTICS = os.getenv("TRANSCRIPTION_KEEP_DIAGNOSTICS", "true").lower() in ("1", "true", "yes")
+
+
+def _plan_piece(piece: List) -> Dict:
+    """Voce del piano salvato: [inizio, fine] oppure [inizio, fine, intervalli parlati] se il VAD era attivo"""
+    return {"start": piece[0], "end": piece[1], "keep": piece[2] if len(piece) > 2 else None}
+
+
+def _build_plan(path: str) -> List[List]:
+    """Pezzi da trascrivere; con il VAD attivo ogni pezzo indica anche gli intervalli da conservare"""
+    silent, duration = analyze_silence(path)
+    plan = []
+    for start, end in plan_chunks_from_mask(silent, duration):
+        if VAD_ENABLED:
+            plan.append([start, end, [list(interval) for interval in speech_intervals(silent, start, end)]])
+        else:
+            plan.append([start, end])
+
+    if VAD_ENABLED:
+        kept = sum(keep_end - keep_start for piece in plan for keep_start, keep_end in piece[2])
+        print(f"🔇 VAD: {duration - kept:.0f}s di pause su {duration:.0f}s non verranno inviati a Whisper")
+    return plan
+
+
+async def _transcribe_piece(
+    limit: asyncio.Semaphore,
+    source_path: str,
+    start: float,
+    end: float,
+    keep: Optional[List],
+    work_dir: str,
+    upload_name: str
+) -> Dict:
+    """
+    Estrae il pezzo con ffmpeg direttamente dal file canonico (senza le pause tagliate dal VAD)
+    e lo trascrive. Il file del pezzo esiste solo durante la trascrizione, così su disco restano
+    al più TRANSCRIPTION_PARALLELISM pezzi alla volta.
+    """
+    piece_path = os.path.join(work_dir, upload_name)
+    relative_keep = [(keep_start - start, keep_end - start) for keep_start, keep_end in keep] if keep else None
+    async with limit:
+        try:
+            await asyncio.to_thread(
+                transcode_to_canonical, source_path, piece_path,
+                start=start, duration=end - start, keep=relative_keep
+            )
+            return await transcription_engine.transcribe_async(piece_path, upload_name=upload_name)
+        finally:
+            if os.path.exists(piece_path):
+                os.remove(piece_path)
+
+
+def shift_segments(segments: List[Dict], offset: float) -> List[Dict]:
+    """Riporta i timestamp dei segmenti di un pezzo alla timeline dell'audio originale"""
+    shifted = []
+    for segment in segments or []:
+        segment = dict(segment)
+        segment["start"] = round(segment["start"] + offset, 3)
+        segment["end"] = round(segment["end"] + offset, 3)
+        shifted.append(segment)
+    return shifted
+
+
+def merge_chunks(chunks: List[TranscriptionChunk]) -> Dict:
+    """Unisce i pezzi in ordine: testo concatenato e segmenti compatti (array paralleli) concatenati"""
+    ordered = sorted(chunks, key=lambda c: c.chunk_number)
+    texts = [chunk.chunk_text.strip() for chunk in ordered if chunk.chunk_text and chunk.chunk_text.strip()]
+    segments = concat_packed([to_packed(chunk.segments) for chunk in ordered])
+    return {"transcription": " ".join(texts), "segments": segments}
+
+
+def piece_event(chunk: TranscriptionChunk, total_chunks: int) -> Dict:
+    """Pezzo completato come viene inviato ai client: paragrafi HTML e segmenti sulla timeline originale"""
+    return {
+        "type": "partial_transcript",
+        "transcript_id": chunk.transcript_id,
+        "chunk_number": chunk.chunk_number,
+        "total_chunks": total_chunks,
+        "start": chunk.start_offset,
+        "end": chunk.end_offset,
+        "html": format_transcription(chunk.chunk_text) if chunk.chunk_text else "",
+        "segments": split_diagnostics(to_packed(chunk.segments))[0]
+    }
+
+
+def create_pending_transcript(db: Session, audio_file: AudioFile) -> Transcript:
+    """Crea la trascrizione in stato 'processing': i pezzi completati vi vengono collegati man mano"""
+    transcript = Transcript(audio_id=audio_file.id, status="processing", created_at=datetime.utcnow())
+    db.add(transcript)
+    db.commit()
+    db.refresh(transcript)
+    return transcript
+
+
+def fill_from_cache(db: Session, audio_file: AudioFile, transcript: Transcript) -> bool:
+    """Completa la trascrizione con il risultato in cache per lo stesso contenuto, se presente"""
+    cached = get_cached_transcription(db, audio_file.content_hash)
+    if not cached:
+        return False
+
+    transcript.transcript_text = cached.transcript_text
+    transcript.segments = cached.segments
+    transcript.model = cached.model
+    transcript.language = cached.language
+    transcript.preprocessing_version = cached.preprocessing_version
+    transcript.status = "completed"
+    db.commit()
+    print(f"⚡ Trascrizione dell'audio {audio_file.id} servita dalla cache")
+    return True
+
+
+def run_transcription(
+    db: Session,
+    audio_file: AudioFile,
+    transcript: Transcript,
+    force: bool = False,
+    on_piece: Optional[Callable[[Dict], None]] = None
+) -> Transcript:
+    """
+    Trascrive un AudioFile: l'audio canonico viene diviso nelle pause in pezzi di durata limitata,
+    trascritti in parallelo. Ogni pezzo viene salvato in transcription_chunks appena completato,
+    quindi rieseguendo la funzione sulla stessa trascrizione si trascrivono solo i pezzi mancanti.
+    Se per lo stesso contenuto esiste un risultato in cache viene usato quello, salvo force=True.
+    on_piece riceve i pezzi completati in ordine di tempo (piece_event), appena è completato
+    anche ogni pezzo precedente: il client può mostrare l'inizio della riunione mentre il resto
+    è ancora in trascrizione.
+    """
+    if not force and fill_from_cache(db, audio_file, transcript):
+        db.refresh(transcript)
+        return transcript
+
+    # Versione canonica (Opus mono 16kHz): creata una sola volta, poi letta direttamente
+    canonical_key = ensure_canonical_audio(db, audio_file)
+
+    transcript.status = "processing"
+    db.commit()
+
+    chunks = db.execute(
+        select(TranscriptionChunk).where(TranscriptionChunk.transcript_id == transcript.id)
+    ).scalars().all()
+    done = {chunk.chunk_number for chunk in chunks}
+
+    with blob_store.local_file(canonical_key) as canonical_path, tempfile.TemporaryDirectory() as work_dir:
+        # Il piano viene salvato: una ripresa usa esattamente gli stessi pezzi
+        if not transcript.chunk_plan:
+            # Analisi delle pause in streaming (PCM a blocchi da ffmpeg), senza decodificare tutto in memoria
+            transcript.chunk_plan = _build_plan(canonical_path)
+            db.commit()
+        pieces = [_plan_piece(piece) for piece in transcript.chunk_plan]
+
+        finished = {chunk.chunk_number: chunk for chunk in chunks}
+        next_to_emit = 0
+
+        def emit_ready_pieces():
+            nonlocal next_to_emit
+            while next_to_emit in finished:
+                if on_piece:
+                    on_piece(piece_event(finished[next_to_emit], len(pieces)))
+                next_to_emit += 1
+
+        # Pezzi già salvati da un'esecuzione precedente
+        emit_ready_pieces()
+
+        pending = [n for n in range(len(pieces)) if n not in done]
+        if done:
+            print(f"⏩ Trascrizione {transcript.id}: {len(done)}/{len(pieces)} pezzi già completati")
+        else:
+            print(f"✂️ Audio {audio_file.id} diviso in {len(pieces)} pezzi")
+
+        # Pezzi trascritti come coroutine sul loop condiviso del processo (client Whisper asincrono),
+        # TRANSCRIPTION_PARALLELISM alla volta; i risultati vengono salvati da questo thread
+        if pending:
+            limit = asyncio.Semaphore(TRANSCRIPTION_PARALLELISM)
+            futures = {
+                submit(_transcribe_piece(
+                    limit,
+                    canonical_path,
+                    pieces[chunk_number]["start"],
+                    pieces[chunk_number]["end"],
+                    pieces[chunk_number]["keep"],
+                    work_dir,
+                    f"audio_{audio_file.id}_{chunk_number}.{CANONICAL_EXTENSION}"
+                )): chunk_number
+                for chunk_number in pending
+            }
+
+            try:
+                for future in as_completed(futures):
+                    chunk_number = futures[future]
+                    result = future.result()
+                    piece = pieces[chunk_number]
+
+                    # Timestamp riportati alla timeline originale (mappa degli offset se il VAD ha tagliato pause)
+                    if piece["keep"]:
+                        segments = restore_segments(result.get("segments"), piece["keep"])
+                    else:
+                        segments = shift_segments(result.get("segments"), piece["start"])
+
+                    # Checkpoint: il pezzo è salvato subito, un'eventuale ripresa lo salta
+                    chunk = TranscriptionChunk(
+                        transcript_id=transcript.id,
+                        chunk_number=chunk_number,
+                        chunk_text=result.get("transcription") or "",
+                        start_offset=piece["start"],
+                        end_offset=piece["end"],
+                        segments=pack_segments(segments, keep_diagnostics=TRANSCRIPTION_KEEP_DIAGNOSTICS)
+                    )
+                    db.add(chunk)
+                    try:
+                        db.commit()
+                    except IntegrityError:
+                        # Pezzo già salvato da un'altra esecuzione (es. task riconsegnato): si usa quello
+                        db.rollback()
+                        chunk = db.execute(
+                            select(TranscriptionChunk).where(
+                                TranscriptionChunk.transcript_id == transcript.id,
+                                TranscriptionChunk.chunk_number == chunk_number
+                            )
+                        ).scalar_one()
+                        print(f"⏭️ Pezzo {chunk_number + 1}/{len(pieces)} già salvato da un'altra esecuzione")
+                    chunks.append(chunk)
+                    finished[chunk_number] = chunk
+                    print(f"✅ Pezzo {chunk_number + 1}/{len(pieces)} trascritto")
+                    emit_ready_pieces()
+            finally:
+                # In caso di errore i pezzi non ancora completati vengono annullati
+                for future in futures:
+                    future.cancel()
+
+    merged = merge_chunks(chunks)
+    if not merged["transcription"]:
+        raise RuntimeError("Trascrizione non trovata nella risposta")
+
+    # Salva la trascrizione formattata nel DB
+    transcript.transcript_text = format_transcription(merged["transcription"])
+    transcript.segments, transcript.segment_diagnostics = split_diagnostics(merged["segments"])
+    key = transcription_key()
+    transcript.model = key["model"]
+    transcript.language = key["language"]
+    transcript.preprocessing_version = key["preprocessing_version"]
+    transcript.status = "completed"
+    db.commit()
+    db.refresh(transcript)
+
+    try:
+        store_transcription(db, audio_file.content_hash, transcript.transcript_text, transcript.segments)
+    except Exception as e:
+        db.rollback()
+        print(f"⚠️ Impossibile salvare la trascrizione in cache: {e}")
+
+    return transcript
@@ -0,0 +1,85 @@
+import os
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Tuple
+import numpy as np
+from dotenv import load_dotenv
+from app.services.chunk_planner import FRAME_MS, find_silences
+
+load_dotenv()
+
+# VAD a energia (opzionale): le pause lunghe vengono tolte dall'audio inviato a Whisper
+VAD_ENABLED = os.getenv("TRANSCRIPTION_VAD_ENABLED", "false").lower() in ("1", "true", "yes")
+# Solo le pause più lunghe di questa durata vengono tagliate
+VAD_MIN_SILENCE_MS = int(os.getenv("TRANSCRIPTION_VAD_MIN_SILENCE_MS", "2000"))
+# Silenzio conservato ai bordi di ogni parte parlata, per non troncare l'inizio e la fine delle frasi
+VAD_PADDING_MS = int(os.getenv("TRANSCRIPTION_VAD_PADDING_MS", "300"))
+
+# Intervallo di audio originale (inizio, fine) in secondi
+Interval = Tuple[float, float]
+
+
+def speech_intervals(silent: np.ndarray, start: float, end: float) -> List[Interval]:
+    """
+    Intervalli da conservare nel pezzo [start, end]: tutto tranne le pause più lunghe di
+    VAD_MIN_SILENCE_MS, ridotte a VAD_PADDING_MS per lato. silent è la maschera per frame
+    calcolata da chunk_planner.analyze_silence.
+    """
+    padding = VAD_PADDING_MS / 1000
+    silences = find_silences(
+        silent, int(start * 1000 / FRAME_MS), int(end * 1000 / FRAME_MS), min_silence_ms=VAD_MIN_SILENCE_MS
+    )
+
+    kept = []
+    cursor = start
+    for silence_start, silence_end in silences:
+        cut_start = silence_start * FRAME_MS / 1000 + padding
+        cut_end = silence_end * FRAME_MS / 1000 - padding
+        if cut_end <= cut_start:
+            continue
+        if cut_start > cursor:
+            kept.append((round(cursor, 3), round(cut_start, 3)))
+        cursor = cut_end
+
+    if end > cursor:
+        kept.append((round(cursor, 3), round(end, 3)))
+
+    # Pezzo interamente silenzioso: si conserva un frammento minimo per non inviare un file vuoto
+    return kept or [(round(start, 3), round(min(end, start + padding * 2), 3))]
+
+
+def build_offset_map(intervals: List[Interval]) -> List[Dict]:
+    """
+    Mappa tra la timeline dell'audio ritagliato e quella originale:
+    ogni voce indica dove inizia la parte nel ritaglio e nell'originale, e la sua durata.
+    """
+    offset_map = []
+    trimmed = 0.0
+    for start, end in intervals:
+        offset_map.append({"trimmed_start": trimmed, "original_start": start, "duration": end - start})
+        trimmed += end - start
+    return offset_map
+
+
+def to_original_time(offset_map: List[Dict], t: float, is_end: bool = False) -> float:
+    """
+    Converte un istante del ritaglio nell'istante corrispondente dell'audio originale.
+    Un istante che cade esattamente su una giunzione è attribuito alla parte successiva
+    se è un inizio, alla precedente se è una fine (così il segmento non include la pausa tagliata).
+    """
+    starts = [entry["trimmed_start"] for entry in offset_map]
+    index = (bisect_left(starts, t) if is_end else bisect_right(starts, t)) - 1
+    entry = offset_map[max(0, index)]
+    within = min(max(t - entry["trimmed_start"], 0.0), entry["duration"])
+    return round(entry["original_start"] + within, 3)
+
+
+def restore_segments(segments: List[Dict], intervals: List[Interval]) -> List[Dict]:
+    """Riporta i timestamp dei segmenti Whisper di un pezzo ritagliato alla timeline dell'audio originale"""
+    offset_map = build_offset_map(intervals)
+    restored = []
+    for segment in segments or []:
+        segment = dict(segment)
+        segment["start"] = to_original_time(offset_map, segment["start"])
+        segment["end"] = to_original_time(offset_map, segment["end"], is_end=True)
+        restored.append(segment)
+    return restored
@@ -0,0 +1,181 @@
+import os
+import struct
+import tempfile
+import time
+from typing import Dict, List, Optional
+import numpy as np
+from dotenv import load_dotenv
+from app.services.blob_store import blob_store
+from app.services.pcm_stream import iter_pcm_blocks
+
+load_dotenv()
+
+# Picchi della forma d'onda, calcolati una sola volta per contenuto (hash)
+PEAKS_DIR = os.getenv("AUDIO_PEAKS_DIR", os.path.join("storage", "peaks"))
+PEAKS_SAMPLE_RATE = 8000
+# Campioni per picco del livello più dettagliato (32 ms a 8 kHz); ogni livello successivo raddoppia
+PEAKS_BASE_SAMPLES = 256
+# Il livello più grossolano ha al massimo questo numero di picchi
+PEAKS_MIN_COUNT = 512
+# Blocchi di PCM letti da ffmpeg (multiplo di PEAKS_BASE_SAMPLES)
+PCM_BLOCK_SAMPLES = PEAKS_BASE_SAMPLES * 1024
+# Un file di lock più vecchio di così appartiene a un calcolo interrotto (es. processo terminato)
+PEAKS_LOCK_STALE_SECONDS = float(os.getenv("AUDIO_PEAKS_LOCK_STALE_SECONDS", "900"))
+
+# Formato file: header, poi per ogni livello (samples_per_peak, count) e count coppie int16 min/max
+PEAKS_MAGIC = b"PEAK"
+PEAKS_VERSION = 1
+_HEADER = struct.Struct("<4sHIH")
+_LEVEL_HEADER = struct.Struct("<II")
+
+
+def peaks_path(content_hash: str) -> str:
+    return os.path.join(PEAKS_DIR, content_hash[:2], f"{content_hash}.peaks")
+
+
+def _reduce_block(samples: np.ndarray, samples_per_peak: int) -> np.ndarray:
+    """Min/max per gruppi di samples_per_peak campioni, con riduzioni vettoriali NumPy"""
+    full = len(samples) // samples_per_peak * samples_per_peak
+    groups = samples[:full].reshape(-1, samples_per_peak)
+    peaks = np.empty((len(groups) + (1 if full < len(samples) else 0), 2), dtype=np.int16)
+    peaks[:len(groups), 0] = groups.min(axis=1)
+    peaks[:len(groups), 1] = groups.max(axis=1)
+    if full < len(samples):
+        tail = samples[full:]
+        peaks[-1] = (tail.min(), tail.max())
+    return peaks
+
+
+def _downsample_level(peaks: np.ndarray) -> np.ndarray:
+    """Livello successivo: ogni coppia di picchi diventa un picco (min dei min, max dei max)"""
+    if len(peaks) % 2:
+        peaks = np.vstack([peaks, peaks[-1:]])
+    pairs = peaks.reshape(-1, 2, 2)
+    return np.stack([pairs[:, :, 0].min(axis=1), pairs[:, :, 1].max(axis=1)], axis=1)
+
+
+def compute_peak_levels(path: str) -> List[Dict]:
+    """
+    Decodifica il file una volta con ffmpeg (PCM mono 8 kHz su pipe, a blocchi)
+    e calcola i picchi di tutti i livelli di risoluzione.
+    """
+    base_blocks = [
+        _reduce_block(samples, PEAKS_BASE_SAMPLES)
+        for samples in iter_pcm_blocks(path, PEAKS_SAMPLE_RATE, PCM_BLOCK_SAMPLES)
+    ]
+
+    level = np.vstack(base_blocks) if base_blocks else np.zeros((0, 2), dtype=np.int16)
+    samples_per_peak = PEAKS_BASE_SAMPLES
+    levels = [{"samples_per_peak": samples_per_peak, "peaks": level}]
+
+    while len(level) > PEAKS_MIN_COUNT:
+        level = _downsample_level(level)
+        samples_per_peak *= 2
+        levels.append({"samples_per_peak": samples_per_peak, "peaks": level})
+
+    return levels
+
+
+def write_peaks_file(levels: List[Dict], output_path: str):
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(output_path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            out.write(_HEADER.pack(PEAKS_MAGIC, PEAKS_VERSION, PEAKS_SAMPLE_RATE, len(levels)))
+            for level in levels:
+                peaks = np.ascontiguousarray(level["peaks"], dtype="<i2")
+                out.write(_LEVEL_HEADER.pack(level["samples_per_peak"], len(peaks)))
+                out.write(peaks.tobytes())
+        os.replace(temp_path, output_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def read_peaks_level(content_hash: str, resolution: int) -> Optional[Dict]:
+    """
+    Legge dal file dei picchi il livello più grossolano che ha almeno `resolution` picchi
+    (o il più dettagliato disponibile). Solo quel livello viene letto dal disco.
+    """
+    path = peaks_path(content_hash)
+    if not os.path.exists(path):
+        return None
+
+    with open(path, "rb") as f:
+        magic, version, sample_rate, level_count = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != PEAKS_MAGIC or version != PEAKS_VERSION:
+            return None
+
+        directory = []
+        offset = _HEADER.size
+        for _ in range(level_count):
+            f.seek(offset)
+            samples_per_peak, count = _LEVEL_HEADER.unpack(f.read(_LEVEL_HEADER.size))
+            directory.append((samples_per_peak, count, offset + _LEVEL_HEADER.size))
+            offset += _LEVEL_HEADER.size + count * 4
+
+        # I livelli sono in ordine di dettaglio decrescente
+        chosen = directory[0]
+        for entry in directory:
+            if entry[1] >= resolution:
+                chosen = entry
+
+        samples_per_peak, count, data_offset = chosen
+        f.seek(data_offset)
+        data = f.read(count * 4)
+
+    return {
+        "sample_rate": sample_rate,
+        "samples_per_peak": samples_per_peak,
+        "count": count,
+        "data": data
+    }
+
+
+def _acquire_peaks_lock(content_hash: str) -> Optional[str]:
+    """
+    Crea il file di lock del calcolo dei picchi di un contenuto; None se un altro processo
+    (un altro worker dell'API) lo sta già calcolando.
+    """
+    lock_path = peaks_path(content_hash) + ".lock"
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+
+    for _ in range(2):
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return lock_path
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) < PEAKS_LOCK_STALE_SECONDS:
+                    return None
+                os.remove(lock_path)
+            except FileNotFoundError:
+                pass
+    return None
+
+
+def ensure_peaks(storage_key: str, content_hash: str) -> Optional[str]:
+    """
+    Calcola i picchi solo se non esistono già per questo contenuto.
+    Restituisce None se il calcolo è già in corso in un altro processo.
+    """
+    output_path = peaks_path(content_hash)
+    if os.path.exists(output_path):
+        return output_path
+
+    lock_path = _acquire_peaks_lock(content_hash)
+    if lock_path is None:
+        return None
+
+    try:
+        # Ricontrollo: un calcolo concorrente potrebbe essere terminato prima del lock
+        if os.path.exists(output_path):
+            return output_path
+        with blob_store.local_file(storage_key) as source_path:
+            levels = compute_peak_levels(source_path)
+        write_peaks_file(levels, output_path)
+        print(f"🌊 Picchi calcolati per {content_hash[:12]} ({len(levels)} livelli)")
+        return output_path
+    finally:
+        os.remove(lock_path)
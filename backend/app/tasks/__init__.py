@@ -0,0 +1 @@
+# Task Celery (registrati da app.celery_worker)
@@ -0,0 +1,132 @@
+from datetime import datetime
+from sqlalchemy.future import select
+from sqlalchemy import update
+from celery.signals import worker_process_init
+from app.celery_worker import celery
+from app.database import SessionLocal
+from app.models.tasks import Task, TaskStatus
+from app.models.transcripts import Transcript
+from app.models.verbs import Verbs
+from app.services.summarizer import generate_summary
+from app.services.job_events import publish_job_event
+from app.services.prompt_cache import prompt_cache
+
+
+@worker_process_init.connect
+def load_prompt_cache(**kwargs):
+    # Ogni processo del worker carica i prompt all'avvio e resta in ascolto delle modifiche
+    try:
+        prompt_cache.load_all()
+    except Exception as e:
+        print(f"⚠️ Cache dei prompt non caricata all'avvio, verrà riempita al primo utilizzo: {e}")
+
+
+class SummaryCancelled(Exception):
+    """Annullamento richiesto tramite POST /jobs/{job_id}/cancel"""
+
+
+def _set_progress(db, task_id: int, progress: int, message: str):
+    db.execute(
+        update(Task).where(Task.id == task_id).values(progress=progress, progress_message=message)
+    )
+    db.commit()
+    publish_job_event(task_id, {"type": "progress", "progress": progress, "message": message})
+
+
+def _check_cancelled(db, task_id: int):
+    # Lettura dopo un commit: si vede la richiesta salvata dall'API nel frattempo
+    if db.execute(select(Task.cancel_requested).filter(Task.id == task_id)).scalar_one():
+        raise SummaryCancelled()
+
+
+@celery.task(name="summary.run")
+def generate_summary_task(task_id: int):
+    """
+    Genera il verbale di un job creato da POST /summary/start/{transcript_id} e salva la riga Verbs.
+    L'annullamento viene verificato tra una fase e l'altra (anche tra le parti di una trascrizione
+    lunga): le chiamate al modello già partite vengono completate, ma il risultato viene scartato.
+    """
+    db = SessionLocal()
+    try:
+        # Solo i job ancora da eseguire (o in corso, se riconsegnati dopo il crash del worker)
+        started = db.execute(
+            update(Task)
+            .where(
+                Task.id == task_id,
+                Task.status.in_([TaskStatus.pending, TaskStatus.processing]),
+                Task.cancel_requested.is_(False)
+            )
+            .values(status=TaskStatus.processing)
+        ).rowcount
+        db.commit()
+        if not started:
+            print(f"⏭️ Job {task_id} già concluso o annullato")
+            return
+
+        transcript_id = db.execute(select(Task.transcript_id).filter(Task.id == task_id)).scalar_one()
+
+        try:
+            _set_progress(db, task_id, 5, "Caricamento della trascrizione")
+            transcript_text = db.execute(
+                select(Transcript.transcript_text).filter(Transcript.id == transcript_id)
+            ).scalar_one_or_none()
+            if not transcript_text:
+                raise ValueError("Testo della trascrizione mancante")
+
+            _check_cancelled(db, task_id)
+            _set_progress(db, task_id, 10, "Generazione del verbale")
+            # La sessione non resta aperta durante le chiamate al modello
+            db.close()
+
+            def on_progress(progress: int, message: str):
+                # Tra una fase e l'altra del map-reduce: aggiorna lo stato e verifica l'annullamento
+                _check_cancelled(db, task_id)
+                _set_progress(db, task_id, progress, message)
+                db.close()
+
+            summary = generate_summary(transcript_text, on_progress=on_progress)
+
+            _check_cancelled(db, task_id)
+            _set_progress(db, task_id, 95, "Salvataggio del verbale")
+            verbs = Verbs(
+                transcript_id=transcript_id,
+                verbs_text=summary,
+                created_at=datetime.utcnow()
+            )
+            db.add(verbs)
+            db.flush()
+            summary_id = verbs.id
+            db.execute(
+                update(Task).where(Task.id == task_id).values(
+                    status=TaskStatus.completed,
+                    result=str(summary_id),
+                    progress=100,
+                    progress_message="Verbale pronto"
+                )
+            )
+            db.commit()
+            publish_job_event(task_id, {"type": "completed", "summary_id": summary_id})
+            print(f"✅ Job {task_id} completato: verbale {summary_id}")
+
+        except SummaryCancelled:
+            db.rollback()
+            db.execute(
+                update(Task).where(Task.id == task_id).values(
+                    status=TaskStatus.cancelled, progress_message="Annullato"
+                )
+            )
+            db.commit()
+            publish_job_event(task_id, {"type": "cancelled"})
+            print(f"🛑 Job {task_id} annullato")
+
+        except Exception as e:
+            db.rollback()
+            print(f"❌ Job {task_id} fallito: {e}")
+            db.execute(
+                update(Task).where(Task.id == task_id).values(status=TaskStatus.failed, error_message=str(e))
+            )
+            db.commit()
+            publish_job_event(task_id, {"type": "failed", "error_message": str(e)})
+
+    finally:
+        db.close()
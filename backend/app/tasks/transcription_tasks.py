@@ -0,0 +1,113 @@
+import os
+from datetime import datetime, timedelta
+from sqlalchemy.future import select
+from sqlalchemy import update
+from dotenv import load_dotenv
+from app.celery_worker import celery
+from app.database import SessionLocal
+from app.models.audio_files import AudioFile
+from app.models.tasks import Task, TaskStatus
+from app.models.transcripts import Transcript
+from app.services.transcription_pipeline import create_pending_transcript, run_transcription
+from app.services.job_events import publish_job_event
+
+load_dotenv()
+
+# Un job pending/processing senza aggiornamenti da questo tempo è considerato perso (es. worker terminato):
+# la ripresa lo chiude come fallito e ne avvia uno nuovo invece di attendere la riconsegna di Redis
+TRANSCRIPTION_JOB_STALE_SECONDS = int(os.getenv("TRANSCRIPTION_JOB_STALE_SECONDS", "1800"))
+
+
+def _set_status(db, task: Task, status: TaskStatus, **values):
+    task.status = status
+    for key, value in values.items():
+        setattr(task, key, value)
+    db.commit()
+
+
+def is_stale_job(task: Task) -> bool:
+    """True se il job risulta attivo a DB ma nessun worker lo sta più eseguendo"""
+    if task.celery_task_id:
+        try:
+            # Messaggio già concluso per Celery ma stato mai aggiornato a DB
+            if celery.AsyncResult(task.celery_task_id).state in ("SUCCESS", "FAILURE", "REVOKED"):
+                return True
+        except Exception as e:
+            print(f"⚠️ Stato Celery del job {task.id} non disponibile: {e}")
+
+    last_update = task.updated_at or task.created_at
+    return last_update is not None and datetime.utcnow() - last_update > timedelta(seconds=TRANSCRIPTION_JOB_STALE_SECONDS)
+
+
+def _touch(db, task_id: int):
+    # Segnale di vita per is_stale_job: aggiornato a ogni pezzo completato
+    db.execute(update(Task).where(Task.id == task_id).values(updated_at=datetime.utcnow()))
+    db.commit()
+
+
+@celery.task(name="transcription.run")
+def transcribe_audio_task(task_id: int, force: bool = False):
+    """
+    Esegue la trascrizione di un job creato da POST /start-transcription o da una ripresa.
+    Se il job ha già una trascrizione collegata (ripresa, o riconsegna dopo il crash del worker)
+    vengono trascritti solo i pezzi mancanti.
+    force: ignora la cache delle trascrizioni e ripete la chiamata a Whisper.
+    """
+    db = SessionLocal()
+    try:
+        # Solo i job ancora da eseguire (o in corso, se riconsegnati dopo il crash del worker):
+        # una riconsegna (task_acks_late) di un job già concluso non deve sovrascriverne lo stato
+        started = db.execute(
+            update(Task)
+            .where(Task.id == task_id, Task.status.in_([TaskStatus.pending, TaskStatus.processing]))
+            .values(status=TaskStatus.processing)
+        ).rowcount
+        db.commit()
+        if not started:
+            print(f"⏭️ Job {task_id} già concluso o non trovato")
+            return
+
+        task = db.execute(select(Task).filter(Task.id == task_id)).scalar_one()
+
+        try:
+            audio_file = db.execute(
+                select(AudioFile).filter(AudioFile.id == task.audio_file_id)
+            ).scalar_one_or_none()
+            if not audio_file:
+                raise ValueError("File audio non trovato")
+
+            if task.transcript_id:
+                transcript = db.execute(
+                    select(Transcript).filter(Transcript.id == task.transcript_id)
+                ).scalar_one()
+            else:
+                transcript = create_pending_transcript(db, audio_file)
+                _set_status(db, task, TaskStatus.processing, transcript_id=transcript.id)
+
+            def on_piece(event):
+                # I pezzi completati vengono pubblicati in ordine di tempo per i client in ascolto
+                publish_job_event(task_id, event)
+                _touch(db, task_id)
+
+            transcript = run_transcription(db, audio_file, transcript, force=force, on_piece=on_piece)
+
+            _set_status(
+                db, task, TaskStatus.completed,
+                transcript_id=transcript.id,
+                result=str(transcript.id)
+            )
+            publish_job_event(task_id, {"type": "completed", "transcript_id": transcript.id})
+            print(f"✅ Job {task_id} completato: trascrizione {transcript.id}")
+
+        except Exception as e:
+            db.rollback()
+            print(f"❌ Job {task_id} fallito: {e}")
+            if task.transcript_id:
+                db.execute(
+                    update(Transcript).where(Transcript.id == task.transcript_id).values(status="failed")
+                )
+            _set_status(db, task, TaskStatus.failed, error_message=str(e))
+            publish_job_event(task_id, {"type": "failed", "error_message": str(e)})
+
+    finally:
+        db.close()
@@ -0,0 +1,47 @@
+import re
+from typing import Optional, Tuple
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    """Range richiesto fuori dai limiti del file"""
+
+
+def parse_range_header(range_header: Optional[str], file_size: int) -> Optional[Tuple[int, int]]:
+    """
+    Interpreta un header Range a intervallo singolo (bytes=inizio-fine, bytes=inizio-, bytes=-suffisso).
+
+    Returns:
+        (start, end) inclusivi, oppure None se l'header è assente o non interpretabile
+        (in quel caso si risponde con il file intero, come previsto da RFC 9110).
+
+    Raises:
+        RangeNotSatisfiable: se l'intervallo non interseca il file
+    """
+    if not range_header:
+        return None
+
+    match = _RANGE_RE.match(range_header.strip())
+    if not match:
+        # Range multipli o unità diverse da bytes: si ignora l'header
+        return None
+
+    start_str, end_str = match.groups()
+    if not start_str and not end_str:
+        return None
+
+    if not start_str:
+        # Suffisso: ultimi N byte
+        suffix = int(end_str)
+        if suffix == 0 or file_size == 0:
+            raise RangeNotSatisfiable()
+        return max(file_size - suffix, 0), file_size - 1
+
+    start = int(start_str)
+    end = int(end_str) if end_str else file_size - 1
+
+    if start >= file_size or end < start:
+        raise RangeNotSatisfiable()
+
+    return start, min(end, file_size - 1)
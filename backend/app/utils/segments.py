@@ -0,0 +1,110 @@
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+# Formato compatto dei segmenti: array paralleli invece di un oggetto per segmento.
+#   segments:    {"start": [...], "end": [...], "text": [...]}
+#   diagnostics: {"avg_logprob": [...], "compression_ratio": [...], ...} (opzionale, salvato a parte)
+# I record precedenti contengono ancora la lista di oggetti restituita da Whisper: tutte le funzioni
+# accettano entrambi i formati.
+SEGMENT_FIELDS = ("start", "end", "text")
+DIAGNOSTIC_FIELDS = ("avg_logprob", "compression_ratio", "no_speech_prob", "temperature")
+
+StoredSegments = Union[Dict, List[Dict], None]
+
+
+def pack_segments(segments: List[Dict], keep_diagnostics: bool = True) -> Dict:
+    """
+    Converte la lista di segmenti Whisper in array paralleli. I token e gli altri campi
+    non elencati vengono scartati; i campi diagnostici finiscono in "diagnostics".
+    """
+    segments = segments or []
+    packed = {
+        "start": [round(float(segment["start"]), 3) for segment in segments],
+        "end": [round(float(segment["end"]), 3) for segment in segments],
+        "text": [segment.get("text", "") for segment in segments]
+    }
+
+    if keep_diagnostics:
+        diagnostics = {
+            field: [segment.get(field) for segment in segments]
+            for field in DIAGNOSTIC_FIELDS
+            if any(field in segment for segment in segments)
+        }
+        if diagnostics:
+            packed["diagnostics"] = diagnostics
+
+    return packed
+
+
+def split_diagnostics(packed: Dict) -> Tuple[Dict, Optional[Dict]]:
+    """Separa i campi diagnostici (salvati in una colonna a parte) dagli array principali"""
+    packed = dict(packed)
+    return packed, packed.pop("diagnostics", None)
+
+
+def concat_packed(parts: Sequence[Dict]) -> Dict:
+    """Unisce più blocchi compatti in ordine; i diagnostici mancanti in un blocco diventano None"""
+    merged = {field: [] for field in SEGMENT_FIELDS}
+    diagnostic_fields = {field for part in parts for field in (part.get("diagnostics") or {})}
+    diagnostics = {field: [] for field in DIAGNOSTIC_FIELDS if field in diagnostic_fields}
+
+    for part in parts:
+        count = len(part.get("start") or [])
+        for field in SEGMENT_FIELDS:
+            merged[field].extend(part.get(field) or [])
+        part_diagnostics = part.get("diagnostics") or {}
+        for field, values in diagnostics.items():
+            values.extend(part_diagnostics.get(field) or [None] * count)
+
+    if diagnostics:
+        merged["diagnostics"] = diagnostics
+    return merged
+
+
+def to_packed(stored: StoredSegments) -> Dict:
+    """Formato compatto da quanto salvato a DB (compatto o lista di oggetti dei record precedenti)"""
+    if not stored:
+        return {field: [] for field in SEGMENT_FIELDS}
+    if isinstance(stored, list):
+        return pack_segments(stored)
+    return stored
+
+
+def segment_count(stored: StoredSegments) -> int:
+    if not stored:
+        return 0
+    if isinstance(stored, list):
+        return len(stored)
+    return len(stored.get("start") or [])
+
+
+def segment_bounds(stored: StoredSegments, index: int) -> Tuple[float, float]:
+    """Inizio e fine (secondi) del segmento index"""
+    if isinstance(stored, list):
+        return stored[index]["start"], stored[index]["end"]
+    return stored["start"][index], stored["end"][index]
+
+
+def select_segment_fields(
+    stored: StoredSegments,
+    diagnostics: Optional[Dict],
+    fields: Sequence[str],
+    layout: str = "columns"
+) -> Union[Dict, List[Dict]]:
+    """
+    Campi richiesti dal client, come array paralleli (layout "columns")
+    oppure come lista di oggetti (layout "rows").
+    """
+    packed = to_packed(stored)
+    diagnostics = diagnostics or packed.get("diagnostics") or {}
+    count = segment_count(packed)
+
+    columns = {}
+    for field in fields:
+        if field in SEGMENT_FIELDS:
+            columns[field] = packed.get(field) or []
+        elif field in DIAGNOSTIC_FIELDS:
+            columns[field] = diagnostics.get(field) or [None] * count
+
+    if layout == "rows":
+        return [{field: values[i] for field, values in columns.items()} for i in range(count)]
+    return columns
@@ -0,0 +1,119 @@
+import os
+import re
+from functools import lru_cache
+from typing import List
+
+# Stima dei token con l'encoding di tiktoken: per i modelli Gemini è un'approssimazione,
+# sufficiente a dimensionare le richieste con margine
+TOKEN_ENCODING = os.getenv("TOKEN_ENCODING", "cl100k_base")
+# Stima usata se l'encoding non è disponibile (tiktoken scarica i file al primo utilizzo)
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(TOKEN_ENCODING)
+    except Exception as e:
+        print(f"⚠️ Encoding {TOKEN_ENCODING} non disponibile, stima dei token dalla lunghezza: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _encoding()
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _split_oversized(paragraph: str, budget: int) -> List[str]:
+    """Divide un paragrafo oltre il budget per frasi e, se non basta, per parole"""
+    pieces, current = [], ""
+    for sentence in re.split(r"(?<=[.?!])\s+", paragraph):
+        candidate = f"{current} {sentence}".strip()
+        if current and count_tokens(candidate) > budget:
+            pieces.append(current)
+            candidate = sentence
+        if count_tokens(candidate) > budget:
+            words, current = candidate.split(), ""
+            for word in words:
+                if current and count_tokens(f"{current} {word}") > budget:
+                    pieces.append(current)
+                    current = word
+                else:
+                    current = f"{current} {word}".strip()
+        else:
+            current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_into_windows(paragraphs: List[str], max_tokens: int) -> List[str]:
+    """
+    Raggruppa i paragrafi, in ordine e senza spezzarli, in finestre di al massimo max_tokens.
+    Le finestre hanno dimensioni simili (la latenza del map dipende dalla finestra più lunga):
+    il numero di finestre è quello minimo e ciascuna punta alla dimensione media.
+    """
+    units = []
+    for paragraph in paragraphs:
+        if count_tokens(paragraph) > max_tokens:
+            units.extend(_split_oversized(paragraph, max_tokens))
+        else:
+            units.append(paragraph)
+
+    sizes = [count_tokens(unit) + 1 for unit in units]
+    total = sum(sizes)
+    if total <= max_tokens:
+        return ["\n".join(units)] if units else []
+
+    window_count = -(-total // max_tokens)
+    target = total / window_count
+
+    windows, current, current_size = [], [], 0
+    for unit, size in zip(units, sizes):
+        # Si chiude la finestra al raggiungimento della media, mai oltre il massimo
+        if current and (current_size + size > max_tokens or current_size >= target):
+            windows.append("\n".join(current))
+            current, current_size = [], 0
+        current.append(unit)
+        current_size += size
+    if current:
+        windows.append("\n".join(current))
+    return windows
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Primi max_tokens token del testo (stesso input, stesso risultato)"""
+    if max_tokens <= 0:
+        return ""
+    encoding = _encoding()
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+
+def fit_texts_to_budget(texts: List[str], max_tokens: int) -> List[str]:
+    """
+    Riduce più testi a un budget complessivo: i testi brevi restano interi, quelli lunghi
+    vengono troncati alla stessa quota, ricavata dal budget rimasto.
+    """
+    sizes = [count_tokens(text) for text in texts]
+    if sum(sizes) <= max_tokens:
+        return list(texts)
+
+    remaining, pending = max_tokens, len(texts)
+    share = 0
+    for size in sorted(sizes):
+        share = remaining // pending
+        if size > share:
+            break
+        remaining -= size
+        pending -= 1
+    return [text if size <= share else truncate_to_tokens(text, share) for text, size in zip(texts, sizes)]
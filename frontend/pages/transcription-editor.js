@@ -1,4 +1,4 @@
-import React, { useEffect, useState } from "react";
+import React, { useEffect, useRef, useState } from "react";
 import { useRouter } from "next/router";
 import { EditorContent, useEditor } from "@tiptap/react";
 import StarterKit from "@tiptap/starter-kit";
@@ -16,7 +16,7 @@ export const getServerSideProps = withAuthPage(async (ctx, userId) => {
 
 const TranscriptionEditor = () => {
   const router = useRouter();
-  const { transcript_id } = router.query;
+  const { transcript_id, job_id } = router.query;
   const [content, setContent] = useState("");
   const [isMounted, setIsMounted] = useState(false);
   const [debounceTimeout, setDebounceTimeout] = useState(null);
@@ -24,6 +24,13 @@ const TranscriptionEditor = () => {
   const [notifications, setNotifications] = useState([]);
   const [progress, setProgress] = useState(null);
   const [isSummarizing, setIsSummarizing] = useState(false);
+  // Job di verbalizzazione in corso (annullabile)
+  const summaryJobId = useRef(null);
+  const [audioId, setAudioId] = useState(null);
+  // Trascrizione ancora in corso: i pezzi completati arrivano dal WebSocket del job
+  const [isTranscribing, setIsTranscribing] = useState(false);
+  const [transcriptionProgress, setTranscriptionProgress] = useState(null);
+  const partialPieces = useRef({});
   
   // Nuovi stati per OneDrive
   const [isUploadingOneDrive, setIsUploadingOneDrive] = useState(false);
@@ -101,7 +108,7 @@ const TranscriptionEditor = () => {
   };
 
   const saveTranscription = async (text) => {
-    if (!transcript_id) return;
+    if (!transcript_id || isTranscribing) return;
     
     try {
       const response = await fetch(
@@ -240,45 +247,139 @@ const TranscriptionEditor = () => {
         `${process.env.NEXT_PUBLIC_BE}/summary/start/${transcript_id}`,
         { method: "POST" }
       );
-      if (response.ok) {
-        const data = await response.json();
-        console.log("risposta --> ", data);
-        router.push(`/summary-editor?summary_id=${data}`);
+      if (!response.ok) {
+        throw new Error("Impossibile avviare la verbalizzazione");
+      }
+
+      const data = await response.json();
+      summaryJobId.current = data.job_id;
+      const summaryId = await waitForSummary(data.job_id);
+      if (summaryId) {
+        router.push(`/summary-editor?summary_id=${summaryId}`);
       }
     } catch (e) {
       console.error("Errore: ", e);
+      alert(`Errore durante la verbalizzazione: ${e.message}`);
     } finally {
+      summaryJobId.current = null;
       setIsSummarizing(false);
       setProgress(null);
     }
   };
 
-  useEffect(() => {
-    const fetchTranscription = async () => {
-      if (!transcript_id) return;
-      try {
-        const response = await fetch(
-          `${process.env.NEXT_PUBLIC_BE}/transcriptions/${transcript_id}`
-        );
-        if (response.ok) {
-          const data = await response.json();
+  // Attende la fine del job di verbalizzazione e restituisce l'ID del verbale (null se annullato)
+  const waitForSummary = async (jobId) => {
+    while (true) {
+      await new Promise((resolve) => setTimeout(resolve, 1500));
 
-          if (data.transcript_text) {
-            editor?.commands.setContent(data.transcript_text);
-            setContent(data.transcript_text);
-          }
+      const response = await fetch(`${process.env.NEXT_PUBLIC_BE}/jobs/${jobId}`);
+      if (!response.ok) {
+        throw new Error("Impossibile recuperare lo stato della verbalizzazione");
+      }
+
+      const job = await response.json();
+      if (job.status === "completed") {
+        return job.result;
+      }
+      if (job.status === "failed") {
+        throw new Error(job.error_message || "Verbalizzazione non riuscita");
+      }
+      if (job.status === "cancelled") {
+        return null;
+      }
+      if (job.progress_message) {
+        setProgress(`${job.progress_message} (${job.progress}%)`);
+      }
+    }
+  };
+
+  const cancelSummary = async () => {
+    if (!summaryJobId.current) return;
+    setProgress("Annullamento in corso...");
+    try {
+      await fetch(`${process.env.NEXT_PUBLIC_BE}/jobs/${summaryJobId.current}/cancel`, {
+        method: "POST",
+      });
+    } catch (e) {
+      console.error("Errore durante l'annullamento: ", e);
+    }
+  };
+
+  const fetchTranscription = async () => {
+    if (!transcript_id) return;
+    try {
+      const response = await fetch(
+        `${process.env.NEXT_PUBLIC_BE}/transcriptions/${transcript_id}`
+      );
+      if (response.ok) {
+        const data = await response.json();
+        setAudioId(data.audio_id);
+
+        if (data.status === "processing" && job_id) {
+          setIsTranscribing(true);
+          editor?.setEditable(false);
         } else {
-          console.error("Errore nel recupero della trascrizione");
+          setIsTranscribing(false);
+          editor?.setEditable(true);
         }
-      } catch (error) {
-        console.error("Errore di rete: ", error);
+
+        if (data.transcript_text) {
+          editor?.commands.setContent(data.transcript_text);
+          setContent(data.transcript_text);
+        }
+      } else {
+        console.error("Errore nel recupero della trascrizione");
       }
-    };
+    } catch (error) {
+      console.error("Errore di rete: ", error);
+    }
+  };
+
+  useEffect(() => {
     if (isMounted) {
       fetchTranscription();
     }
   }, [transcript_id, editor, isMounted]);
 
+  // Mostra i pezzi della trascrizione man mano che il job li completa (in ordine di tempo)
+  useEffect(() => {
+    if (!isTranscribing || !job_id || !editor) return;
+
+    const socketDomain = process.env.NEXT_PUBLIC_BE?.replace(/^https?:\/\//, "");
+    const protocol = window.location.protocol === "https:" ? "wss" : "ws";
+    const ws = new WebSocket(`${protocol}://${socketDomain}/jobs/${job_id}/events`);
+
+    ws.onmessage = (event) => {
+      const data = JSON.parse(event.data);
+
+      if (data.type === "partial_transcript") {
+        partialPieces.current[data.chunk_number] = data.html;
+        const pieces = [];
+        for (let n = 0; partialPieces.current[n] !== undefined; n++) {
+          pieces.push(partialPieces.current[n]);
+        }
+        editor.commands.setContent(pieces.join("\n"));
+        setTranscriptionProgress({ done: pieces.length, total: data.total_chunks });
+      } else if (data.type === "completed") {
+        partialPieces.current = {};
+        setTranscriptionProgress(null);
+        fetchTranscription();
+      } else if (data.type === "failed") {
+        setTranscriptionProgress({ error: data.error_message || "Trascrizione non riuscita" });
+      }
+    };
+
+    ws.onerror = (error) => {
+      console.error("Errore WebSocket del job:", error);
+    };
+
+    return () => {
+      if (ws.readyState === WebSocket.OPEN) {
+        ws.close();
+      }
+    };
+  }, [isTranscribing, job_id, editor]);
+
   if (!isMounted) return null;
 
   return (
@@ -319,8 +420,37 @@ const TranscriptionEditor = () => {
             <FaRobot />
             {isSummarizing ? "Verbalizzazione in corso..." : "Verbalizza"}
           </button>
+          {isSummarizing && (
+            <button onClick={cancelSummary} className={styles.saveButton}>
+              Annulla
+            </button>
+          )}
         </div>
         
+        {isTranscribing && (
+          <div className={styles.transcriptionProgress}>
+            {transcriptionProgress?.error
+              ? `Trascrizione interrotta: ${transcriptionProgress.error}`
+              : transcriptionProgress
+              ? `Trascrizione in corso: ${transcriptionProgress.done}/${transcriptionProgress.total} parti pronte`
+              : "Trascrizione in corso..."}
+          </div>
+        )}
+
+        {isSummarizing && progress && (
+          <div className={styles.transcriptionProgress}>{progress}</div>
+        )}
+
+        {/* Riproduzione con seek: il backend serve solo l'intervallo richiesto (Range) */}
+        {audioId && (
+          <audio
+            controls
+            preload="metadata"
+            className={styles.audioPlayer}
+            src={`${process.env.NEXT_PUBLIC_BE}/audio/${audioId}/stream`}
+          />
+        )}
+
         <div className={styles.editorBox}>
           <EditorContent editor={editor} />
         </div>
@@ -344,6 +474,11 @@ const TranscriptionEditor = () => {
             <FaRobot />
             {isSummarizing ? "Verbalizzazione in corso..." : "Verbalizza"}
           </button>
+          {isSummarizing && (
+            <button onClick={cancelSummary} className={styles.saveButton}>
+              Annulla
+            </button>
+          )}
           
           <button
             onClick={saveToOneDrive}
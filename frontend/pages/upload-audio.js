@@ -172,41 +172,66 @@ const UploadPage = () => {
     }
   
     setIsTranscribing(true);
-  
-    const fetchPromise = fetch(
-      `${process.env.NEXT_PUBLIC_BE}/start-transcription/${audioFileId}`,
-      {
-        method: "POST",
-      }
-    );
-  
-    setProgress("Converto il formato per un'ottima compatibilità...");
-    await new Promise((resolve) => setTimeout(resolve, 3000));
-  
-    setProgress("Divido l'audio in segmenti...");
-    await new Promise((resolve) => setTimeout(resolve, 3000));
-  
-    setProgress("Effettuo la trascrizione...");
+    setProgress("Avvio la trascrizione...");
   
     try {
-      const response = await fetchPromise;
-  
-      if (response.ok) {
-        const data = await response.json();
-        setProgress("Reindirizzo alla pagina editor...");
+      const response = await fetch(
+        `${process.env.NEXT_PUBLIC_BE}/start-transcription/${audioFileId}`,
+        {
+          method: "POST",
+        }
+      );
   
-        setTimeout(() => {
-          router.push(`/transcription-editor?transcript_id=${data.transcript_id}`);
-        }, 2500);
-      } else {
+      if (!response.ok) {
         const errorData = await response.json();
         console.error("Errore backend: ", errorData.detail);
         alert(`Errore durante l'avvio della trascrizione: ${errorData.detail}`);
+        setIsTranscribing(false);
+        setProgress(null);
+        return;
       }
+
+      const data = await response.json();
+      let transcriptId = data.transcript_id;
+      let editorUrl = `/transcription-editor?transcript_id=${transcriptId}`;
+
+      // La trascrizione gira in background: appena il job ha creato la trascrizione si apre l'editor,
+      // che mostra i pezzi man mano che vengono completati
+      if (!transcriptId) {
+        setProgress("Effettuo la trascrizione...");
+        transcriptId = await waitForJob(data.job_id);
+        editorUrl = `/transcription-editor?transcript_id=${transcriptId}&job_id=${data.job_id}`;
+      }
+
+      setProgress("Reindirizzo alla pagina editor...");
+      setTimeout(() => {
+        router.push(editorUrl);
+      }, 1000);
     } catch (error) {
       console.error("Errore:", error);
-      alert("Errore di rete durante l'avvio della trascrizione.");
+      alert(`Errore durante la trascrizione: ${error.message}`);
       setIsTranscribing(false);
+      setProgress(null);
+    }
+  };
+
+  // Attende che il job abbia creato la trascrizione (anche se non ancora completata) e ne restituisce l'ID
+  const waitForJob = async (jobId) => {
+    while (true) {
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+
+      const response = await fetch(`${process.env.NEXT_PUBLIC_BE}/jobs/${jobId}`);
+      if (!response.ok) {
+        throw new Error("Impossibile recuperare lo stato della trascrizione");
+      }
+
+      const job = await response.json();
+      if (job.transcript_id && job.status !== "failed") {
+        return job.transcript_id;
+      }
+      if (job.status === "failed") {
+        throw new Error(job.error_message || "Trascrizione non riuscita");
+      }
     }
   };
 